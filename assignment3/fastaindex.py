@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+    usage:
+        Only to be imported as module
+
+    This module provides random access into uncompressed FASTA files:
+    - building and loading a samtools-compatible .fai index
+    - parsing "chrom", "chrom:start-end" region strings (1-based, inclusive)
+    - slicing a region out of a memory-mapped file without parsing the rest
+"""
+
+# METADATA VARIABLES
+__author__ = "Orfeas Gkourlias"
+__status__ = "Production"
+__version__ = "1.0"
+
+# IMPORTS
+import mmap
+import os
+import re
+from fastareader import GZIP_MAGIC, WHITESPACE, header_name
+
+# CONSTANTS
+REGION_PATTERN = re.compile(r"^(?P<name>[^:]+?)(?::(?P<start>[\d,]+)(?:-(?P<end>[\d,]+))?)?$")
+
+
+# CLASSES
+class FastaIndex:
+    """
+    Memory-mapped random access to the records of an uncompressed FASTA file.
+
+    The index is read from `<path>.fai`, and built next to the FASTA file when it is
+    missing or older than the FASTA file.
+
+    Attributes:
+        path (str | pathlib.Path): Path to the FASTA file.
+        entries (dict[str, tuple[int, int, int, int]]): Record name to
+            (length, offset, line_bases, line_width).
+
+    Methods:
+        fetch(region):
+            Returns the sequence bytes of a "chrom:start-end" region.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fai_path = f"{path}.fai"
+        with open(self.path, "rb") as fasta_f:
+            if fasta_f.read(2) == GZIP_MAGIC:
+                raise ValueError(
+                    f"{path} is compressed; region queries need an uncompressed FASTA file"
+                )
+        if not os.path.exists(self.fai_path) or (
+            os.path.getmtime(self.fai_path) < os.path.getmtime(self.path)
+        ):
+            build_index(self.path, self.fai_path)
+        self.entries = read_index(self.fai_path)
+
+    def fetch(self, region: str) -> bytes:
+        """
+        Returns the sequence of a region, without line breaks.
+
+        Args:
+            region (str): "chrom", "chrom:start" or "chrom:start-end" (1-based, inclusive).
+
+        Returns:
+            bytes: The region's sequence, clipped to the record length.
+        """
+        name, start, end = self.parse_region(region)
+        length, offset, line_bases, line_width = self.entries[name]
+        if start >= end:
+            return b""
+
+        first = offset + (start // line_bases) * line_width + start % line_bases
+        last = offset + ((end - 1) // line_bases) * line_width + (end - 1) % line_bases
+        with open(self.path, "rb") as fasta_f:
+            with mmap.mmap(fasta_f.fileno(), 0, access=mmap.ACCESS_READ) as fasta_mm:
+                return fasta_mm[first : last + 1].translate(None, WHITESPACE)
+
+    def parse_region(self, region: str):
+        """
+        Converts a region string into a (name, start, end) tuple with 0-based,
+        half-open coordinates clipped to the record.
+        """
+        match = REGION_PATTERN.match(region.strip())
+        if not match or match["name"] not in self.entries:
+            raise ValueError(f"Unknown region {region!r} in {self.path}")
+        length = self.entries[match["name"]][0]
+        start = int(match["start"].replace(",", "")) - 1 if match["start"] else 0
+        end = int(match["end"].replace(",", "")) if match["end"] else length
+        return match["name"], max(start, 0), min(end, length)
+
+
+# FUNCTIONS
+def build_index(path, fai_path):
+    """
+    Scans a FASTA file once and writes a .fai index with one line per record:
+    name, length, byte offset of the first base, bases per line and bytes per line.
+    """
+    entries = []
+    record = None
+    offset = 0
+    with open(path, "rb") as fasta_f:
+        for line in fasta_f:
+            line_len = len(line)
+            if line.startswith(b">"):
+                if record:
+                    entries.append(record)
+                record = [header_name(line[1:]), 0, offset + line_len, 0, 0, False]
+            elif record is not None:
+                bases = len(line.rstrip(b"\r\n"))
+                if record[5] and bases:
+                    raise ValueError(
+                        f"Record {record[0]} in {path} has lines of different lengths"
+                    )
+                if record[3] == 0:
+                    record[3], record[4] = bases, line_len
+                elif bases != record[3]:
+                    record[5] = True  # Only the last line may be shorter
+                record[1] += bases
+            offset += line_len
+    if record:
+        entries.append(record)
+
+    with open(fai_path, "w") as fai_f:
+        for name, length, seq_offset, line_bases, line_width, _ in entries:
+            fai_f.write(f"{name}\t{length}\t{seq_offset}\t{line_bases}\t{line_width}\n")
+
+
+def read_index(fai_path) -> dict:
+    """
+    Reads a .fai index into a dictionary of name to (length, offset, line_bases, line_width).
+    """
+    entries = {}
+    with open(fai_path) as fai_f:
+        for line in fai_f:
+            name, length, offset, line_bases, line_width = line.split("\t")[:5]
+            # Like samtools, the first record wins when names are duplicated
+            entries.setdefault(
+                name, (int(length), int(offset), int(line_bases), int(line_width))
+            )
+    return entries
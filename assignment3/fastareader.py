@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+"""
+    usage:
+        Only to be imported as module
+
+    This module provides a streaming FASTA reader:
+    - plain, gzip and bgzip input (detected from the magic bytes)
+    - bgzip blocks decompressed in parallel, gzip decompressed on a pipelined thread
+    - reads large binary blocks instead of text lines
+    - joins wrapped sequence lines into whole records
+    - yields records in bounded pieces so files larger than RAM can be scanned
+"""
+
+# METADATA VARIABLES
+__author__ = "Orfeas Gkourlias"
+__status__ = "Production"
+__version__ = "1.0"
+
+# IMPORTS
+import gzip
+import os
+import queue
+import struct
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# CONSTANTS
+GZIP_MAGIC = b"\x1f\x8b"
+BGZF_HEADER = struct.Struct("<4sI2BH")  # magic + CM + FLG, MTIME, XFL, OS, XLEN
+BGZF_TRAILER = struct.Struct("<2I")  # CRC32, ISIZE
+BLOCK_SIZE = 2**22
+WHITESPACE = b" \t\r\n"
+
+
+# CLASSES
+class FastaReader:
+    """
+    Streaming reader for (optionally gzip/bgzip compressed) FASTA files.
+
+    Attributes:
+        path (str | pathlib.Path): Path to the FASTA file.
+        block_size (int): Number of bytes read from the file at a time, and the
+            approximate size of the sequence pieces that are yielded.
+        threads (int): Threads used to decompress bgzip blocks (zlib releases the GIL).
+
+    Methods:
+        blocks():
+            Yields decompressed blocks of the file in order. bgzip (BGZF) input is split
+            into its independent blocks, which are inflated in parallel on a thread
+            pool; plain gzip is inflated on one background thread so decompression
+            overlaps with whatever consumes the blocks.
+
+        chunks():
+            Yields (name, chunk, last) tuples. Chunks never span two records and
+            `last` is True for the final chunk of each record.
+
+        records():
+            Yields (name, sequence) tuples with the whole record sequence as bytes.
+
+        pieces(overlap):
+            Yields sequence pieces of about `block_size` bases, where consecutive pieces
+            of the same record overlap by `overlap` bases. Used for k-mer counting with
+            overlap k - 1 so no k-mer is lost at a piece boundary.
+
+        spans(overlap):
+            Like pieces(), but also yields how many leading positions each piece owns,
+            so k-mers of several lengths can be counted without double counting.
+    """
+
+    def __init__(self, path, block_size=BLOCK_SIZE, threads=None):
+        self.path = path
+        self.block_size = block_size
+        self.threads = threads or os.cpu_count() or 1
+
+    def blocks(self):
+        """
+        Yields the decompressed content of the file in order, in blocks.
+        """
+        with open(self.path, "rb") as raw_f:
+            header = raw_f.read(BGZF_HEADER.size + 4)
+        if is_bgzf(header):
+            yield from self.bgzf_blocks()
+        elif header[:2] == GZIP_MAGIC:
+            yield from self.threaded_blocks()
+        else:
+            with open(self.path, "rb") as fasta_f:
+                while block := fasta_f.read(self.block_size):
+                    yield block
+
+    def bgzf_blocks(self):
+        """
+        Inflates BGZF blocks on a thread pool, keeping a bounded number in flight.
+        """
+        in_flight = deque()
+        with open(self.path, "rb") as raw_f, ThreadPoolExecutor(self.threads) as pool:
+            for block in read_bgzf_blocks(raw_f):
+                in_flight.append(pool.submit(inflate_bgzf_block, block))
+                if len(in_flight) >= 4 * self.threads:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+    def threaded_blocks(self):
+        """
+        Inflates plain gzip on a background thread, a few blocks ahead of the consumer.
+        """
+        blocks = queue.Queue(maxsize=4)
+        stop = threading.Event()
+
+        def inflate():
+            try:
+                with gzip.open(self.path, "rb") as gzip_f:
+                    while not stop.is_set():
+                        block = gzip_f.read(self.block_size)
+                        blocks.put(block)
+                        if not block:
+                            break
+            except BaseException as error:
+                blocks.put(error)
+
+        thread = threading.Thread(target=inflate, daemon=True)
+        thread.start()
+        try:
+            while True:
+                block = blocks.get()
+                if isinstance(block, BaseException):
+                    raise block
+                if not block:
+                    break
+                yield block
+        finally:
+            stop.set()
+            while thread.is_alive():  # Unblock the thread if it waits on a full queue
+                try:
+                    blocks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    def chunks(self):
+        """
+        Yields (name, chunk, last) tuples of whitespace-free sequence bytes.
+
+        Headers are only recognised at the start of a line, and sequence data before
+        the first header is reported under an empty name.
+        """
+        name = None
+        pending = bytearray()
+        header = None  # Partial header line while it spans two blocks
+        at_line_start = True
+
+        for block in self.blocks():
+            pos = 0
+            while pos < len(block):
+                if header is not None:
+                    newline = block.find(b"\n", pos)
+                    if newline == -1:
+                        header += block[pos:]
+                        break
+                    header += block[pos:newline]
+                    if name is not None or pending:
+                        yield name or "", bytes(pending), True
+                        pending.clear()
+                    name = header_name(header)
+                    header = None
+                    pos = newline + 1
+                    at_line_start = True
+                    continue
+
+                if at_line_start and block[pos : pos + 1] == b">":
+                    header = bytearray()
+                    pos += 1
+                    continue
+
+                marker = block.find(b"\n>", pos)
+                end = len(block) if marker == -1 else marker + 1
+                pending += block[pos:end].translate(None, WHITESPACE)
+                at_line_start = block[end - 1 : end] == b"\n"
+                pos = end
+
+                if len(pending) >= self.block_size:
+                    yield name or "", bytes(pending), False
+                    pending.clear()
+
+        if header is not None:
+            if name is not None or pending:
+                yield name or "", bytes(pending), True
+                pending.clear()
+            name = header_name(header)
+        if name is not None or pending:
+            yield name or "", bytes(pending), True
+
+    def records(self):
+        """
+        Yields (name, sequence) tuples, one per FASTA record.
+        """
+        parts = []
+        for name, chunk, last in self.chunks():
+            parts.append(chunk)
+            if last:
+                yield name, b"".join(parts)
+                parts = []
+
+    def pieces(self, overlap=0):
+        """
+        Yields sequence pieces, overlapping by `overlap` bases within a record.
+        """
+        for piece, _ in self.spans(overlap):
+            yield piece
+
+    def spans(self, overlap=0):
+        """
+        Yields (piece, n_starts) tuples, where consecutive pieces of a record overlap by
+        `overlap` bases and each piece owns the first `n_starts` positions. Every position
+        of a record is owned by exactly one piece.
+        """
+        tail = b""
+        for _, chunk, last in self.chunks():
+            piece = tail + chunk
+            if last:
+                yield piece, len(piece)
+                tail = b""
+            else:
+                if len(piece) > overlap:
+                    yield piece, len(piece) - overlap
+                tail = piece[-overlap:] if overlap else b""
+
+
+# FUNCTIONS
+def is_bgzf(header: bytes) -> bool:
+    """
+    Returns True if a file header is a gzip member with the BGZF "BC" extra subfield.
+    """
+    if len(header) < BGZF_HEADER.size + 4:
+        return False
+    magic, _, _, _, xlen = BGZF_HEADER.unpack_from(header)
+    return magic == b"\x1f\x8b\x08\x04" and xlen >= 6 and header[12:14] == b"BC"
+
+
+def read_bgzf_blocks(raw_f):
+    """
+    Yields the raw (still compressed) BGZF blocks of a file, using the block size
+    stored in each block's "BC" extra subfield.
+    """
+    while header := raw_f.read(BGZF_HEADER.size):
+        if len(header) < BGZF_HEADER.size:
+            raise ValueError("Truncated BGZF block header")
+        _, _, _, _, xlen = BGZF_HEADER.unpack(header)
+        extra = raw_f.read(xlen)
+        block_size = None
+        pos = 0
+        while pos + 4 <= len(extra):
+            subfield, length = extra[pos : pos + 2], struct.unpack_from("<H", extra, pos + 2)[0]
+            if subfield == b"BC" and length == 2:
+                block_size = struct.unpack_from("<H", extra, pos + 4)[0] + 1
+            pos += 4 + length
+        if block_size is None:
+            raise ValueError("gzip member without BGZF block size")
+        rest = raw_f.read(block_size - BGZF_HEADER.size - xlen)
+        if len(rest) < block_size - BGZF_HEADER.size - xlen:
+            raise ValueError("Truncated BGZF block")
+        yield rest
+
+
+def inflate_bgzf_block(block: bytes) -> bytes:
+    """
+    Inflates the deflate payload of one BGZF block and checks its CRC32 and size.
+    """
+    data = zlib.decompress(block[: -BGZF_TRAILER.size], -15)
+    crc, size = BGZF_TRAILER.unpack(block[-BGZF_TRAILER.size :])
+    if zlib.crc32(data) != crc or len(data) != size:
+        raise ValueError("BGZF block failed its CRC check")
+    return data
+
+
+def header_name(header) -> str:
+    """
+    Returns the record name: the first word of a header line without the '>'.
+    """
+    words = bytes(header).split(maxsplit=1)
+    return words[0].decode() if words else ""
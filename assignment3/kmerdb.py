@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+"""
+    usage:
+        Only to be imported as module
+
+    This module stores k-mer counts on disk so later queries do not recount:
+    - a compact binary file of sorted k-mer codes and counts, memory-mapped on load
+    - content hashes of the FASTA inputs already merged into a database
+    - a cache location keyed by input content hash, k and counting mode
+"""
+
+# METADATA VARIABLES
+__author__ = "Orfeas Gkourlias"
+__status__ = "Production"
+__version__ = "1.0"
+
+# IMPORTS
+import hashlib
+import json
+import os
+import struct
+import numpy as np
+from motiftools import KmerCounts
+
+# CONSTANTS
+MAGIC = b"KMERDB1\0"
+HEADER_LEN = struct.Struct("<Q")
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "motifcli")
+
+
+# CLASSES
+class KmerDB:
+    """
+    Persistent k-mer count database with incremental updates.
+
+    File layout: MAGIC, the length of a JSON header, the JSON header (k, canonical, number
+    of k-mers and source digests) padded to 8 bytes, then the uint64 codes followed by the
+    int64 counts. Both arrays are memory-mapped when the database is opened.
+
+    Attributes:
+        path (str | pathlib.Path): Location of the database file.
+        k (int): Length of the stored k-mers.
+        canonical (bool): Whether the counts are canonical (strand-merged).
+        sources (list[str]): Content digests of the inputs merged into the database.
+        counts (KmerCounts): The stored counts.
+
+    Methods:
+        add(digest, counts):
+            Merges the counts of a new input into the database.
+
+        save():
+            Atomically writes the database to `path`.
+    """
+
+    def __init__(self, path, k, canonical=False):
+        self.path = path
+        self.k = k
+        self.canonical = canonical
+        self.sources = []
+        self.counts = KmerCounts(k, canonical=canonical)
+        if os.path.exists(path):
+            self.load()
+
+    def __contains__(self, digest) -> bool:
+        return digest in self.sources
+
+    def load(self):
+        """
+        Reads the header and memory-maps the code and count arrays.
+        """
+        with open(self.path, "rb") as db_f:
+            if db_f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a k-mer database")
+            (header_len,) = HEADER_LEN.unpack(db_f.read(HEADER_LEN.size))
+            header = json.loads(db_f.read(header_len))
+            data_offset = db_f.tell()
+
+        if header["k"] != self.k or header["canonical"] != self.canonical:
+            raise ValueError(
+                f"{self.path} holds k={header['k']} (canonical={header['canonical']}) counts, "
+                f"not k={self.k} (canonical={self.canonical})"
+            )
+        self.sources = header["sources"]
+        n_kmers = header["n_kmers"]
+        if n_kmers:
+            codes = np.memmap(
+                self.path, np.uint64, "r", offset=data_offset, shape=(n_kmers,)
+            )
+            counts = np.memmap(
+                self.path, np.int64, "r", offset=data_offset + 8 * n_kmers, shape=(n_kmers,)
+            )
+            self.counts = KmerCounts(self.k, codes, counts, self.canonical)
+
+    def add(self, digest, counts):
+        """
+        Merges new counts into the database and records their source digest.
+        """
+        if digest in self.sources:
+            return
+        self.counts = KmerCounts.merge(
+            self.k,
+            [(self.counts.codes, self.counts.counts), (counts.codes, counts.counts)],
+            self.canonical,
+        )
+        self.sources.append(digest)
+
+    def save(self):
+        """
+        Writes the database to a temporary file and moves it into place.
+        """
+        header = json.dumps(
+            {
+                "k": self.k,
+                "canonical": self.canonical,
+                "n_kmers": len(self.counts),
+                "sources": self.sources,
+            }
+        ).encode()
+        header += b" " * (-(len(MAGIC) + HEADER_LEN.size + len(header)) % 8)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as db_f:
+            db_f.write(MAGIC)
+            db_f.write(HEADER_LEN.pack(len(header)))
+            db_f.write(header)
+            # tofile streams the arrays to the file instead of building a bytes copy first
+            np.asarray(self.counts.codes, dtype=np.uint64).tofile(db_f)
+            np.asarray(self.counts.counts, dtype=np.int64).tofile(db_f)
+        os.replace(tmp_path, self.path)
+
+
+# FUNCTIONS
+def input_digest(path, region=None, block_size=2**22) -> str:
+    """
+    Returns the SHA-256 digest of a file's content (plus the region, if any).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as input_f:
+        while block := input_f.read(block_size):
+            digest.update(block)
+    if region:
+        digest.update(f"\0{region}".encode())
+    return digest.hexdigest()
+
+
+def cache_path(cache_dir, digest, k, canonical=False) -> str:
+    """
+    Returns the cache file for one input digest, k and counting mode.
+    """
+    mode = "-canonical" if canonical else ""
+    return os.path.join(cache_dir, f"{digest}-k{k}{mode}.kmerdb")
@@ -2,7 +2,10 @@
 
 """
     usage:
-        python3 motifcli.py --input path/to/file.fasta --k 6 --top 10 [--min-gc 0.5]
+        python3 motifcli.py --input path/to/file.fasta --k 6 --top 10 [--min-gc 0.5] [--canonical]
+            [--workers 4] [--region chr1:1000-2000] [--db counts.kmerdb] [--motifs ACGTAC]
+        python3 motifcli.py --input path/to/file.fasta --k 4-16 --top 10
+        python3 motifcli.py --input path/to/file.fasta --k 24 --top 10 --approximate
 
     This script analyzes DNA sequences to identify frequent k-mers (motifs).
 """
@@ -15,6 +18,9 @@ __version__ = "1.0"
 # IMPORTS
 import sys
 import motiftools
+from fastareader import FastaReader
+from fastaindex import FastaIndex
+from kmerdb import KmerDB, DEFAULT_CACHE_DIR, cache_path, input_digest
 import argparse
 import pathlib
 
@@ -24,8 +30,9 @@ class Motifcli:
     """
     Command-line interface for motif analysis in DNA sequences.
 
-    This class reads DNA sequences from a FASTA file, counts k-mers of a specified length,
-    identifies the most frequent k-mers (motifs), and optionally filters motifs by minimum GC content.
+    This class reads DNA sequences from a FASTA file, counts k-mers of a specified length
+    (or a range of lengths in one pass), identifies the most frequent k-mers (motifs),
+    and optionally filters motifs by minimum GC content.
     """
 
     def __init__(self) -> None:
@@ -35,33 +42,109 @@ class Motifcli:
         # Read sequences from FASTA file
         self.sequences = self.read_fasta()
 
-        # Count all k-mers
-        self.kmers = self.count_kmers()
+        # Count all k-mers, one table per k-mer length
+        self.kmer_tables = self.count_kmers()
 
-        # Get top N most frequent k-mers
-        self.top = self.get_top()
+        for k, kmers in self.kmer_tables.items():
+            self.k, self.kmers = k, kmers
 
-        # Optionally filter by GC content
-        self.min_filtered = None
-        if self.args.min_gc:
-            self.min_filtered = self.get_filtered()
+            # Get top N most frequent k-mers
+            self.top = self.get_top()
 
-        # Output results
-        self.print_info()
+            # Optionally filter by GC content
+            self.min_filtered = None
+            if self.args.min_gc:
+                self.min_filtered = self.get_filtered()
+
+            # Output results
+            self.print_info()
 
     def read_fasta(self):
         """
-        Reads DNA sequences from a FASTA file, ignoring header lines.
+        Streams DNA sequences from a (gzipped) FASTA file, ignoring header lines.
+
+        Wrapped records are joined and yielded in bounded pieces that overlap by k - 1
+        bases, so k-mers spanning line breaks or piece boundaries are still counted.
+        With --region only that region is sliced out of the memory-mapped file. For a
+        range of k the pieces overlap by max(k) - 1 and carry how many positions they own.
         """
-        with open(self.args.input, "r") as fasta_f:
-            sequences = [line.strip() for line in fasta_f if ">" not in line]
-        return sequences
+        if self.args.region:
+            try:
+                return [FastaIndex(self.args.input).fetch(self.args.region)]
+            except ValueError as e:  # Unknown region, or a compressed input
+                self.parser.error(str(e))
+        reader = FastaReader(self.args.input)
+        overlap = max(self.args.k) - 1
+        if len(self.args.k) > 1:
+            return reader.spans(overlap)
+        return reader.pieces(overlap)
 
     def count_kmers(self):
         """
-        Counts k-mers in the sequences using motiftools.
+        Returns the k-mer counts of the input per k, from k-mer databases.
+
+        The database is --db when given, otherwise (with --cache) a cache file keyed by the
+        input's content hash, k and counting mode. The input is only counted (and merged
+        into the database) for the k values whose database does not hold its hash yet.
+        With --approximate the counts come from a fixed-size sketch instead.
+        """
+        if self.args.approximate:
+            return {k: self.count_sketch(k) for k in self.args.k}
+        if not self.args.cache and not self.args.db:
+            return self.count_input(self.args.k)
+
+        digest = input_digest(self.args.input, self.args.region)
+        try:
+            dbs = {
+                k: KmerDB(
+                    self.args.db
+                    or cache_path(self.args.cache_dir, digest, k, self.args.canonical),
+                    k,
+                    self.args.canonical,
+                )
+                for k in self.args.k
+            }
+        except ValueError as e:  # Not a database, or one of another k or counting mode
+            self.parser.error(str(e))
+        missing = [k for k, db in dbs.items() if digest not in db]
+        if missing:
+            for k, counts in self.count_input(missing).items():
+                dbs[k].add(digest, counts)
+                dbs[k].save()
+        return {k: db.counts for k, db in dbs.items()}
+
+    def count_input(self, ks):
         """
-        return motiftools.count_kmers(self.sequences, self.args.k)
+        Counts k-mers in the sequences using motiftools. A single k can be counted
+        across a process pool; a range of k is counted in one pass over the input.
+        """
+        if len(self.args.k) > 1:
+            return motiftools.count_kmers_multi(
+                self.sequences, ks, canonical=self.args.canonical
+            )
+        k = ks[0]
+        if self.args.workers > 1:
+            return {
+                k: motiftools.count_kmers_parallel(
+                    self.sequences, k, self.args.workers, canonical=self.args.canonical
+                )
+            }
+        return {
+            k: motiftools.count_kmers(self.sequences, k, canonical=self.args.canonical)
+        }
+
+    def count_sketch(self, k):
+        """
+        Estimates k-mer counts with a Count-Min sketch that tracks heavy hitters.
+        """
+        sketch = motiftools.CountMinSketch(
+            k,
+            width=self.args.sketch_width,
+            depth=self.args.sketch_depth,
+            capacity=max(10 * self.args.top, 1000),
+            canonical=self.args.canonical,
+        )
+        return sketch.count(self.sequences)
 
     def get_top(self):
         """
@@ -79,10 +162,30 @@ class Motifcli:
         """
         Prints the most frequent k-mers and any that meet the GC content filter.
         """
-        print(f"Top {self.args.top} motifs (k={self.args.k}):")
+        strand = ", canonical" if self.args.canonical else ""
+        print(f"Top {self.args.top} motifs (k={self.k}{strand}):")
         for kmer in self.top:
             print(f"{kmer[0]} - {kmer[1]}")  # (k-mer, count)
 
+        if isinstance(self.kmers, motiftools.CountMinSketch):
+            print(
+                f"Approximate counts: overestimated by at most {self.kmers.error_bound} "
+                f"with probability {self.kmers.confidence:.2%} "
+                f"(sketch {self.kmers.depth}x{self.kmers.width}, "
+                f"{self.kmers.nbytes / 2**20:.2f} MiB)"
+            )
+
+        if len(self.kmer_tables) > 1:
+            print(
+                f"{len(self.kmers)} distinct {self.k}-mers, "
+                f"{self.kmers.nbytes / 2**20:.2f} MiB"
+            )
+
+        if self.args.motifs:
+            print("Motif counts:")
+            for motif in self.args.motifs:
+                print(f"{motif} - {self.kmers.get(motif.upper(), 0)}")
+
         if self.min_filtered:
             print(f"Filtered by GC content > {int(self.args.min_gc * 100)}%:")
             print("\n".join(self.min_filtered))
@@ -94,6 +197,8 @@ class Motifcli:
         parser = argparse.ArgumentParser(
             description="Find and filter DNA motifs from a FASTA file."
         )
+        # Kept to report errors found in the input after parsing, like the checks below
+        self.parser = parser
         parser.add_argument(
             "--input",
             required=True,
@@ -101,7 +206,10 @@ class Motifcli:
             help="Path to FASTA input file.",
         )
         parser.add_argument(
-            "--k", required=True, type=int, help="Length of k-mers to search for."
+            "--k",
+            required=True,
+            type=k_range,
+            help="Length of k-mers to search for, or a range such as 4-16.",
         )
         parser.add_argument(
             "--top", required=True, type=int, help="Number of top motifs to return."
@@ -109,7 +217,84 @@ class Motifcli:
         parser.add_argument(
             "--min-gc", type=float, help="Minimum GC content for filtering (0–1)."
         )
-        return parser.parse_args()
+        parser.add_argument(
+            "--canonical",
+            action="store_true",
+            help="Count each k-mer together with its reverse complement.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes used to count k-mers (default: 1).",
+        )
+        parser.add_argument(
+            "--region",
+            help="Only count k-mers in this region, e.g. chr1:1000-2000 "
+            "(1-based, inclusive; needs an uncompressed FASTA file).",
+        )
+        parser.add_argument(
+            "--motifs", nargs="+", help="Also print the counts of these k-mers."
+        )
+        parser.add_argument(
+            "--db",
+            type=pathlib.Path,
+            help="K-mer database to read from and merge this input into.",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Cache the counts of every k, so later runs on the same input do not "
+            "recount (a full count table per k; can take GBs for large k).",
+        )
+        parser.add_argument(
+            "--cache-dir",
+            type=pathlib.Path,
+            default=DEFAULT_CACHE_DIR,
+            help=f"Directory of cached k-mer counts for --cache (default: {DEFAULT_CACHE_DIR}).",
+        )
+        parser.add_argument(
+            "--approximate",
+            action="store_true",
+            help="Estimate counts with a fixed-memory Count-Min sketch (for large k).",
+        )
+        parser.add_argument(
+            "--sketch-width",
+            type=int,
+            default=2**20,
+            help="Counters per sketch row; the error bound is e / width * total k-mers.",
+        )
+        parser.add_argument(
+            "--sketch-depth",
+            type=int,
+            default=4,
+            help="Sketch rows; the bound holds with probability 1 - exp(-depth).",
+        )
+        args = parser.parse_args()
+        if len(args.k) > 1 and args.workers > 1:
+            parser.error("--workers can only be used with a single --k")
+        if len(args.k) > 1 and args.db:
+            parser.error("--db holds a single k; use the cache for a range of --k")
+        if args.approximate and (len(args.k) > 1 or args.workers > 1 or args.db):
+            parser.error("--approximate counts a single --k without --workers or --db")
+        return args
+
+
+# FUNCTIONS
+def k_range(value):
+    """
+    Parses "6" or "4-16" into a list of k-mer lengths.
+    """
+    first, _, last = value.partition("-")
+    try:
+        ks = list(range(int(first), int(last or first) + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid k or k range: {value!r}") from None
+    if not ks or not all(1 <= k <= motiftools.MAX_K for k in ks):
+        raise argparse.ArgumentTypeError(
+            f"k must be between 1 and {motiftools.MAX_K}, got {value!r}"
+        )
+    return ks
 
 
 # MAIN
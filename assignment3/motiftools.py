@@ -6,9 +6,11 @@
 
     This module provides basic motif analysis utilities:
     - k-mer generation
-    - k-mer frequency counting
+    - 2-bit integer encoding of sequences and k-mers
+    - k-mer frequency counting (single process or sharded across a process pool)
     - top-k selection
-    - GC content filtering
+    - approximate heavy-hitter counting with a Count-Min sketch
+    - GC content calculation and filtering (vectorised over many k-mers)
 """
 
 # METADATA VARIABLES
@@ -16,7 +18,485 @@ __author__ = "Orfeas Gkourlias"
 __status__ = "Production"
 __version__ = "1.0"
 
+# IMPORTS
+import heapq
+import itertools
+import math
+import multiprocessing as mp
+import queue as queue_module
+import sys
+import traceback
+from collections.abc import Mapping
+
+import numpy as np
+
+# CONSTANTS
+# 2-bit nucleotide codes; A < C < G < T so integer order matches string order.
+NUCLEOTIDES = "ACGT"
+INVALID_CODE = 4
+ENCODING = np.full(256, INVALID_CODE, dtype=np.uint8)
+for _code, _nuc in enumerate(NUCLEOTIDES):
+    ENCODING[ord(_nuc)] = _code
+    ENCODING[ord(_nuc.lower())] = _code
+DECODING = np.frombuffer(NUCLEOTIDES.encode(), dtype=np.uint8)
+GC_TABLE = np.zeros(256, dtype=np.uint8)
+GC_TABLE[np.frombuffer(b"GCgc", dtype=np.uint8)] = 1
+
+# Largest k that fits in a 64-bit code, and largest k counted into a dense 4^k array.
+MAX_K = 32
+DENSE_MAX_K = 11
+# Sparse tables of up to this k switch to a dense array once that takes less memory
+# (4^12 and 4^13 int64 counts take 134 MB and 537 MB).
+DENSE_SWITCH_MAX_K = 13
+# Pending tables are folded into the running table once they hold this many entries,
+# or as many as the running table, whichever is larger.
+FOLD_MIN_ENTRIES = 2**20
+# Codes of many short sequences are collected up to this many before they are counted in
+# one go, so thousands of short records do not each pay for a 4^k bincount or a np.unique.
+CODE_BUFFER_SIZE = 2**22
+# Seconds between checks that the k-mer workers are still alive while waiting on a queue
+WORKER_POLL_INTERVAL = 1.0
+
+
+# CLASSES
+class KmerCounts(Mapping):
+    """
+    Read-only mapping of k-mer strings to counts backed by two NumPy arrays.
+
+    The k-mers are kept as sorted 2-bit integer codes next to their counts, so lookups are
+    binary searches and strings are only decoded when a caller iterates over the mapping.
+
+    Attributes:
+        k (int): Length of the k-mers.
+        canonical (bool): Whether each k-mer was merged with its reverse complement.
+        codes (np.ndarray): Sorted uint64 k-mer codes.
+        counts (np.ndarray): int64 counts aligned with `codes`.
+    """
+
+    def __init__(self, k: int, codes=None, counts=None, canonical=False) -> None:
+        self.k = k
+        self.canonical = canonical
+        self.codes = np.empty(0, dtype=np.uint64) if codes is None else codes
+        self.counts = np.empty(0, dtype=np.int64) if counts is None else counts
+
+    @classmethod
+    def from_kmer_codes(cls, k: int, kmer_code_arrays, canonical=False):
+        """
+        Builds counts from one or more arrays of (unsorted, repeated) k-mer codes.
+        """
+        tally = KmerTally(k, canonical)
+        for kmer_codes_arr in kmer_code_arrays:
+            tally.add_codes(kmer_codes_arr)
+        return tally.result()
+
+    @classmethod
+    def merge(cls, k: int, tables, canonical=False):
+        """
+        Merges sorted (codes, counts) tables into one KmerCounts instance.
+        """
+        tables = [(codes, counts) for codes, counts in tables if len(codes)]
+        if not tables:
+            return cls(k, canonical=canonical)
+        if len(tables) == 1:
+            codes, counts = tables[0]
+            return cls(k, codes.astype(np.uint64), counts.astype(np.int64), canonical)
+
+        all_codes = np.concatenate([codes for codes, _ in tables]).astype(np.uint64)
+        all_counts = np.concatenate([counts for _, counts in tables]).astype(np.int64)
+        order = np.argsort(all_codes, kind="stable")
+        all_codes, all_counts = all_codes[order], all_counts[order]
+        starts = np.flatnonzero(np.concatenate(([True], all_codes[1:] != all_codes[:-1])))
+        return cls(k, all_codes[starts], np.add.reduceat(all_counts, starts), canonical)
+
+    def __getitem__(self, kmer: str) -> int:
+        code = encode_kmer(kmer)
+        if code is None or len(kmer) != self.k:
+            raise KeyError(kmer)
+        if self.canonical:
+            code = min(code, reverse_complement_code(code, self.k))
+        idx = np.searchsorted(self.codes, np.uint64(code))
+        if idx == len(self.codes) or self.codes[idx] != code:
+            raise KeyError(kmer)
+        return int(self.counts[idx])
+
+    def __iter__(self):
+        return iter(decode_kmers(self.codes, self.k))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def items(self):
+        return zip(decode_kmers(self.codes, self.k), self.counts.tolist())
+
+    def to_dict(self) -> dict[str, int]:
+        """
+        Returns the counts as a plain dictionary.
+        """
+        return dict(self.items())
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the code and count arrays, in bytes.
+        """
+        return self.codes.nbytes + self.counts.nbytes
+
+
+class KmerTally:
+    """
+    Running k-mer count table whose memory follows the number of distinct k-mers, not the
+    length of the input.
+
+    Codes are buffered up to CODE_BUFFER_SIZE before they are counted. For k <= DENSE_MAX_K
+    counts go into a dense 4^k array: with one bincount for a large batch, with np.add.at
+    for a batch much smaller than the array. For larger k each batch of codes is reduced
+    to a sorted (codes, counts) table, and pending tables are folded into the running
+    table as soon as they outgrow it, so at most about twice the final table is held at
+    once. Up to DENSE_SWITCH_MAX_K the table becomes a dense array when that is smaller
+    than the sparse one.
+
+    Methods:
+        add_codes(kmer_codes_arr):
+            Adds an array of (unsorted, repeated) k-mer codes.
+
+        flush():
+            Counts the buffered codes.
+
+        add_table(codes, counts):
+            Adds a sorted table of distinct codes and their counts.
+
+        result():
+            Returns the counts so far as a KmerCounts instance.
+    """
+
+    def __init__(self, k: int, canonical=False) -> None:
+        self.k = k
+        self.canonical = canonical
+        self.dense = np.zeros(4**k, dtype=np.int64) if k <= DENSE_MAX_K else None
+        self.table = (np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64))
+        self.pending = []
+        self.n_pending = 0
+        self.buffer = []
+        self.n_buffered = 0
+
+    def add_codes(self, kmer_codes_arr: np.ndarray):
+        if not len(kmer_codes_arr):
+            return
+        self.buffer.append(kmer_codes_arr)
+        self.n_buffered += len(kmer_codes_arr)
+        if self.n_buffered >= CODE_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Counts the buffered codes.
+        """
+        if not self.buffer:
+            return
+        codes = self.buffer[0] if len(self.buffer) == 1 else np.concatenate(self.buffer)
+        self.buffer, self.n_buffered = [], 0
+        if self.dense is None:
+            self.add_table(*np.unique(codes, return_counts=True))
+        elif 8 * len(codes) >= len(self.dense):
+            self.dense += np.bincount(codes.astype(np.intp), minlength=len(self.dense))
+        else:
+            np.add.at(self.dense, codes.astype(np.intp), 1)
+
+    def add_table(self, codes: np.ndarray, counts: np.ndarray):
+        if self.dense is not None:
+            self.dense[codes.astype(np.intp)] += counts  # Codes are distinct
+            return
+        self.pending.append((codes, counts))
+        self.n_pending += len(codes)
+        if self.n_pending >= max(len(self.table[0]), FOLD_MIN_ENTRIES):
+            self.fold()
+
+    def fold(self):
+        if not self.pending:
+            return
+        merged = KmerCounts.merge(self.k, [self.table, *self.pending])
+        self.table = (merged.codes, merged.counts)
+        self.pending, self.n_pending = [], 0
+        # 16 bytes per sparse entry against 8 bytes per dense slot
+        if self.k <= DENSE_SWITCH_MAX_K and 2 * len(merged.codes) >= 4**self.k:
+            self.dense = np.zeros(4**self.k, dtype=np.int64)
+            self.dense[merged.codes.astype(np.intp)] = merged.counts
+            self.table = None
+
+    def result(self) -> KmerCounts:
+        self.flush()
+        if self.dense is not None:
+            codes = np.flatnonzero(self.dense).astype(np.uint64)
+            return KmerCounts(self.k, codes, self.dense[codes], self.canonical)
+        self.fold()
+        codes, counts = self.table
+        return KmerCounts(self.k, codes, counts, self.canonical)
+
+
+class CountMinSketch:
+    """
+    Approximate k-mer counter with fixed memory: a Count-Min sketch plus a bounded set
+    of heavy-hitter candidates.
+
+    Every k-mer increments one counter per row; the estimate of a k-mer is the minimum
+    of its counters, which never underestimates and overestimates by at most
+    `error_bound` with probability `confidence`. After each sequence the candidate set
+    is refreshed with that sequence's k-mers and trimmed to the `capacity` k-mers with
+    the highest estimates.
+
+    Attributes:
+        k (int): Length of the k-mers.
+        width (int): Counters per row, rounded up to a power of two.
+        depth (int): Number of rows (independent hash functions).
+        capacity (int): Maximum number of tracked heavy-hitter candidates.
+        canonical (bool): Whether k-mers are merged with their reverse complement.
+        total (int): Number of k-mers added.
+    """
+
+    def __init__(self, k, width=2**20, depth=4, capacity=1000, canonical=False, seed=0):
+        check_k(k)
+        self.k = k
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self.depth = depth
+        self.capacity = capacity
+        self.canonical = canonical
+        self.total = 0
+        self.shift = np.uint64(64 - self.width.bit_length() + 1)
+        # Odd multipliers for multiply-shift hashing, one per row
+        self.multipliers = np.random.default_rng(seed).integers(
+            0, 2**64, size=depth, dtype=np.uint64, endpoint=False
+        ) | np.uint64(1)
+        self.table = np.zeros((depth, self.width), dtype=np.int64)
+        self.candidates = np.empty(0, dtype=np.uint64)
+
+    @classmethod
+    def from_error(cls, k, epsilon, delta, **kwargs):
+        """
+        Sizes the sketch so estimates exceed true counts by at most epsilon * total
+        with probability 1 - delta.
+        """
+        width = math.ceil(math.e / epsilon)
+        depth = math.ceil(math.log(1 / delta))
+        return cls(k, width, depth, **kwargs)
+
+    @property
+    def error_bound(self) -> int:
+        """
+        Maximum overestimate of any count, holding with probability `confidence`.
+        """
+        return math.ceil(math.e / self.width * self.total)
+
+    @property
+    def confidence(self) -> float:
+        return 1 - math.exp(-self.depth)
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes + self.capacity * 8
+
+    def buckets(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Returns the counter index of every code in every row, shape (depth, len(codes)).
+        """
+        return (codes[None, :] * self.multipliers[:, None]) >> self.shift
+
+    def estimate_codes(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Returns the estimated counts of integer k-mer codes.
+        """
+        rows = np.arange(self.depth)[:, None]
+        return self.table[rows, self.buckets(codes).astype(np.intp)].min(axis=0)
+
+    def update(self, codes: np.ndarray):
+        """
+        Adds an array of k-mer codes to the sketch and refreshes the candidates.
+        """
+        if not len(codes):
+            return
+        for row, buckets in enumerate(self.buckets(codes).astype(np.intp)):
+            np.add.at(self.table[row], buckets, 1)
+        self.total += len(codes)
+
+        pool = np.union1d(self.candidates, codes)
+        if len(pool) > self.capacity:
+            estimates = self.estimate_codes(pool)
+            keep = np.argpartition(-estimates, self.capacity - 1)[: self.capacity]
+            pool = np.sort(pool[keep])
+        self.candidates = pool
+
+    def count(self, sequences):
+        """
+        Adds every k-mer of the sequences to the sketch.
+        """
+        for seq in sequences:
+            self.update(kmer_codes(encode_sequence(seq), self.k, self.canonical))
+        return self
+
+    def heavy_hitters(self) -> KmerCounts:
+        """
+        Returns the tracked candidates with their estimated counts.
+        """
+        return KmerCounts(
+            self.k, self.candidates, self.estimate_codes(self.candidates), self.canonical
+        )
+
+    def get(self, kmer: str, default=0) -> int:
+        """
+        Returns the estimated count of any k-mer, tracked or not.
+        """
+        code = encode_kmer(kmer)
+        if code is None or len(kmer) != self.k:
+            return default
+        if self.canonical:
+            code = min(code, reverse_complement_code(code, self.k))
+        return int(self.estimate_codes(np.array([code], dtype=np.uint64))[0])
+
+
 # FUNCTIONS
+def encode_sequence(seq) -> np.ndarray:
+    """
+    Encodes a DNA sequence into 2-bit nucleotide codes.
+
+    Upper and lower case bases are treated the same; every other character
+    (N, IUPAC ambiguity codes, gaps) becomes INVALID_CODE.
+
+    Args:
+        seq (str | bytes): DNA sequence.
+
+    Returns:
+        np.ndarray: uint8 array with one code per base.
+    """
+    if isinstance(seq, str):
+        seq = seq.encode("ascii", "replace")
+    return ENCODING[np.frombuffer(seq, dtype=np.uint8)]
+
+
+def encode_kmer(kmer: str):
+    """
+    Encodes a single k-mer into its integer code, or None if it holds non-ACGT bases.
+    """
+    codes = encode_sequence(kmer)
+    if len(codes) > MAX_K or (codes == INVALID_CODE).any():
+        return None
+    code = 0
+    for nuc_code in codes.tolist():
+        code = (code << 2) | nuc_code
+    return code
+
+
+def reverse_complement_code(code: int, k: int) -> int:
+    """
+    Returns the integer code of the reverse complement of an encoded k-mer.
+    """
+    rc_code = 0
+    for _ in range(k):
+        rc_code = (rc_code << 2) | (3 - (code & 3))
+        code >>= 2
+    return rc_code
+
+
+def decode_kmers(codes: np.ndarray, k: int) -> list[str]:
+    """
+    Decodes an array of integer k-mer codes back into strings.
+    """
+    codes = np.asarray(codes, dtype=np.uint64)
+    shifts = np.arange(2 * (k - 1), -1, -2, dtype=np.uint64)
+    nuc_codes = (codes[:, None] >> shifts) & np.uint64(3)
+    chars = DECODING[nuc_codes.astype(np.intp)]
+    return np.ascontiguousarray(chars).view(f"S{k}").ravel().astype(str).tolist()
+
+
+def kmer_codes(codes: np.ndarray, k: int, canonical: bool = False) -> np.ndarray:
+    """
+    Computes the rolling 2-bit code of every valid k-mer in an encoded sequence.
+
+    Windows overlapping a non-ACGT base are dropped, so the rolling code effectively
+    restarts after every N. In canonical mode the reverse complement code is rolled
+    alongside the forward code and the smaller of the two is kept.
+
+    Args:
+        codes (np.ndarray): Output of `encode_sequence`.
+        k (int): Length of k-mers.
+        canonical (bool): Return min(kmer, reverse complement) codes.
+
+    Returns:
+        np.ndarray: uint64 codes, one per valid window, in sequence order.
+    """
+    n_windows = len(codes) - k + 1
+    if n_windows <= 0:
+        return np.empty(0, dtype=np.uint64)
+
+    rolling = np.zeros(n_windows, dtype=np.uint64)
+    for offset in range(k):
+        rolling <<= np.uint64(2)
+        rolling |= codes[offset : offset + n_windows]
+
+    if canonical:
+        # The complement of base i lands at position k - 1 - i of the reverse complement.
+        complement = (3 - codes.astype(np.int64)).astype(np.uint64)
+        rc_rolling = np.zeros(n_windows, dtype=np.uint64)
+        for offset in range(k):
+            rc_rolling |= complement[offset : offset + n_windows] << np.uint64(2 * offset)
+        np.minimum(rolling, rc_rolling, out=rolling)
+
+    invalid = np.concatenate(([0], np.cumsum(codes == INVALID_CODE)))
+    valid = invalid[k:] == invalid[:n_windows]
+    return rolling[valid]
+
+
+def multi_kmer_codes(codes: np.ndarray, ks, canonical: bool = False, n_starts=None):
+    """
+    Computes the k-mer codes of several lengths in one pass over an encoded sequence.
+
+    The rolling codes are nested: the (k + 1)-mer code starting at a position is the k-mer
+    code shifted left plus one base, and its reverse complement is the k-mer's reverse
+    complement plus one complemented base on the left. Each step therefore extends the
+    previous length instead of rescanning the sequence.
+
+    Args:
+        codes (np.ndarray): Output of `encode_sequence`.
+        ks (Iterable[int]): K-mer lengths to report.
+        canonical (bool): Return min(kmer, reverse complement) codes.
+        n_starts (int | None): Only count windows starting before this position.
+
+    Yields:
+        tuple[int, np.ndarray]: (k, uint64 codes of every valid k-mer).
+    """
+    ks = sorted(set(ks))
+    if n_starts is None:
+        n_starts = len(codes)
+    n_starts = max(min(n_starts, len(codes)), 0)
+
+    # Pad with invalid bases so every start has a full-length window; padded windows are dropped.
+    padded = np.full(n_starts + ks[-1] - 1, INVALID_CODE, dtype=np.uint8)
+    n_copied = min(len(codes), len(padded))
+    padded[:n_copied] = codes[:n_copied]
+    invalid = np.concatenate(([0], np.cumsum(padded == INVALID_CODE)))
+    complement = (3 - padded.astype(np.int64)).astype(np.uint64)
+
+    rolling = np.zeros(n_starts, dtype=np.uint64)
+    rc_rolling = np.zeros(n_starts, dtype=np.uint64)
+    for offset in range(ks[-1]):
+        rolling <<= np.uint64(2)
+        rolling |= padded[offset : offset + n_starts]
+        if canonical:
+            rc_rolling |= complement[offset : offset + n_starts] << np.uint64(2 * offset)
+
+        k = offset + 1
+        if k in ks:
+            valid = invalid[k : k + n_starts] == invalid[:n_starts]
+            kmer_codes_k = np.minimum(rolling, rc_rolling) if canonical else rolling
+            yield k, kmer_codes_k[valid]
+
+
+def check_k(k: int) -> None:
+    """
+    Raises ValueError if `k` cannot be represented by the integer encoding.
+    """
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}, got {k}")
+
+
 def kmer_generator(seq: str, k: int):
     """
     Generates all k-mers of length `k` from a DNA sequence `seq`.
@@ -30,59 +510,312 @@ def kmer_generator(seq: str, k: int):
         i += 1
 
 
-def count_kmers(sequences: list[str], k: int):
+def count_kmers(sequences: list[str], k: int, canonical: bool = False):
     """
     Counts the frequency of each k-mer across a list of sequences.
 
+    Sequences are 2-bit encoded and scanned with a rolling integer code instead of slicing
+    a string per position. Lower case bases count as upper case and k-mers containing any
+    non-ACGT base (N, ambiguity codes) are skipped.
+
     Args:
         sequences (list[str]): List of DNA sequences.
         k (int): Length of k-mers to count.
+        canonical (bool): Count each k-mer together with its reverse complement,
+            reported under the lexicographically smaller of the two.
 
     Returns:
-        dict[str, int]: Dictionary mapping k-mers to their counts.
+        KmerCounts: Mapping of k-mers to their counts, in lexicographic order.
     """
-    kmer_dict = {}
+    check_k(k)
+    return KmerCounts.from_kmer_codes(
+        k,
+        (kmer_codes(encode_sequence(seq), k, canonical) for seq in sequences),
+        canonical,
+    )
+
+
+def count_kmers_multi(sequences, ks, canonical: bool = False):
+    """
+    Counts k-mers of several lengths in a single pass over the sequences.
+
+    Args:
+        sequences (Iterable[str | bytes | tuple]): DNA sequences, or (sequence, n_starts)
+            pairs as produced by `FastaReader.spans` that only own their first
+            `n_starts` window starts.
+        ks (Iterable[int]): K-mer lengths to count.
+        canonical (bool): Count k-mers together with their reverse complement.
+
+    Returns:
+        dict[int, KmerCounts]: Counts per k, in increasing order of k.
+    """
+    ks = sorted(set(ks))
+    for k in ks:
+        check_k(k)
+    tallies = {k: KmerTally(k, canonical) for k in ks}
+
     for sequence in sequences:
-        for kmer in kmer_generator(sequence, k):
-            if kmer in kmer_dict:
-                kmer_dict[kmer] += 1
-            else:
-                kmer_dict[kmer] = 1
-    return kmer_dict
+        seq, n_starts = sequence if isinstance(sequence, tuple) else (sequence, None)
+        for k, codes in multi_kmer_codes(encode_sequence(seq), ks, canonical, n_starts):
+            tallies[k].add_codes(codes)
+
+    return {k: tallies[k].result() for k in ks}
 
 
-def find_top_kmers(kmer_counts: dict[str, int], top_n: int = 10):
+def shard_sequences(sequences, k: int, shard_size: int):
+    """
+    Groups sequences into shards of roughly `shard_size` bases.
+
+    Sequences longer than `shard_size` are split into pieces that overlap by k - 1 bases,
+    so every k-mer start position falls in exactly one piece.
+
+    Yields:
+        list[str]: Sequences (or pieces of sequences) making up one shard.
+    """
+    shard, shard_len = [], 0
+    for seq in sequences:
+        for start in range(0, max(len(seq), 1), shard_size):
+            piece = seq[start : start + shard_size + k - 1]
+            shard.append(piece)
+            shard_len += len(piece)
+            if shard_len >= shard_size:
+                yield shard
+                shard, shard_len = [], 0
+    if shard:
+        yield shard
+
+
+def partition_bounds(k: int, n_partitions: int) -> np.ndarray:
+    """
+    Returns the code values splitting the 4^k code space into equal ranges.
+    """
+    return np.array(
+        [(4**k * part) // n_partitions for part in range(1, n_partitions)],
+        dtype=np.uint64,
+    )
+
+
+def count_worker(k, canonical, part, tasks, inboxes, results):
+    """
+    Process worker of `count_kmers_parallel`.
+
+    Counts the shards it takes from `tasks` into one local table until it gets None, sends
+    code range j of that table to `inboxes[j]`, merges the tables all workers sent to its
+    own range `part` and puts (part, codes, counts) on `results`. A failure is reported as
+    ("error", traceback) instead.
+    """
+    try:
+        tally = KmerTally(k, canonical)
+        while (shard := tasks.get()) is not None:
+            for seq in shard:
+                tally.add_codes(kmer_codes(encode_sequence(seq), k, canonical))
+        table = tally.result()
+        del tally
+        splits = np.searchsorted(table.codes, partition_bounds(k, len(inboxes)))
+        for inbox, codes, counts in zip(
+            inboxes, np.split(table.codes, splits), np.split(table.counts, splits)
+        ):
+            inbox.put((codes, counts))
+        del table
+        merged = KmerCounts.merge(k, [inboxes[part].get() for _ in inboxes])
+        results.put((part, merged.codes, merged.counts))
+    except Exception:
+        results.put(("error", traceback.format_exc()))
+        sys.exit(1)
+
+
+def check_workers(procs, results) -> None:
+    """
+    Raises if one of the worker processes failed or was killed, with the traceback the
+    worker put on `results` when there is one.
+    """
+    failed = [proc for proc in procs if proc.exitcode not in (None, 0)]
+    if not failed:
+        return
+    try:
+        result = results.get(timeout=WORKER_POLL_INTERVAL)
+    except queue_module.Empty:
+        result = None
+    if result is not None and result[0] == "error":
+        raise RuntimeError(f"k-mer worker failed:\n{result[1]}")
+    raise RuntimeError(f"k-mer worker {failed[0].pid} exited with code {failed[0].exitcode}")
+
+
+def count_kmers_parallel(
+    sequences, k: int, workers: int, canonical: bool = False, shard_size: int = 2**22
+):
+    """
+    Counts k-mers across worker processes; the result equals `count_kmers`.
+
+    Sequences are cut into overlapping shards and handed out over a bounded queue. Every
+    worker folds its shards into one local table, then the tables are split by code range
+    and each range is merged by its own worker, so both counting and merging run in
+    parallel. Because the ranges are disjoint and ordered, the parent only concatenates
+    the merged ranges, and never holds a shard table. A worker that fails or dies stops
+    the run with a RuntimeError.
+
+    Args:
+        sequences (Iterable[str]): DNA sequences.
+        k (int): Length of k-mers to count.
+        workers (int): Number of worker processes.
+        canonical (bool): Count k-mers together with their reverse complement.
+        shard_size (int): Approximate number of bases per shard.
+
+    Returns:
+        KmerCounts: Mapping of k-mers to their counts, in lexicographic order.
+    """
+    check_k(k)
+    tasks = mp.Queue(maxsize=2 * workers)
+    inboxes = [mp.Queue() for _ in range(workers)]
+    results = mp.Queue()
+    procs = [
+        mp.Process(target=count_worker, args=(k, canonical, part, tasks, inboxes, results))
+        for part in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    try:
+        shards = shard_sequences(sequences, k, shard_size)
+        for task in itertools.chain(shards, [None] * workers):
+            while True:
+                try:
+                    tasks.put(task, timeout=WORKER_POLL_INTERVAL)
+                    break
+                except queue_module.Full:
+                    check_workers(procs, results)
+        partitions = [None] * workers
+        for _ in procs:
+            while True:
+                try:
+                    result = results.get(timeout=WORKER_POLL_INTERVAL)
+                    break
+                except queue_module.Empty:
+                    check_workers(procs, results)
+            if result[0] == "error":
+                raise RuntimeError(f"k-mer worker failed:\n{result[1]}")
+            partitions[result[0]] = result[1:]
+    except BaseException:
+        for proc in procs:  # The others may wait for tables or tasks that never come
+            proc.terminate()
+        tasks.cancel_join_thread()  # Tasks nobody will read must not block our exit
+        raise
+    finally:
+        for proc in procs:
+            proc.join()
+    return KmerCounts(
+        k,
+        np.concatenate([codes for codes, _ in partitions]).astype(np.uint64),
+        np.concatenate([counts for _, counts in partitions]).astype(np.int64),
+        canonical,
+    )
+
+
+def find_top_kmers(kmer_counts, top_n: int = 10):
     """
     Returns the top N most frequent k-mers.
 
+    Ties are broken by k-mer in lexicographic order, so results are reproducible.
+    Array-backed KmerCounts are selected with NumPy argpartition; any other mapping or
+    iterator of (k-mer, count) pairs is streamed through a heap bounded to `top_n`.
+    A CountMinSketch answers from its heavy-hitter candidates with estimated counts.
+
     Args:
-        kmer_counts (dict[str, int]): Dictionary of k-mer counts.
+        kmer_counts (Mapping[str, int] | Iterable[tuple[str, int]] | CountMinSketch):
+            K-mer counts.
         top_n (int): Number of top entries to return.
 
     Returns:
         list[tuple[str, int]]: List of (k-mer, count) tuples sorted by frequency.
     """
-    return sorted(kmer_counts.items(), key=lambda key: key[1], reverse=True)[:top_n]
+    if top_n <= 0:
+        return []
+    if isinstance(kmer_counts, CountMinSketch):
+        kmer_counts = kmer_counts.heavy_hitters()
+    if isinstance(kmer_counts, KmerCounts):
+        return top_kmer_codes(kmer_counts, top_n)
+    pairs = kmer_counts.items() if isinstance(kmer_counts, Mapping) else kmer_counts
+    return heapq.nsmallest(top_n, pairs, key=lambda pair: (-pair[1], pair[0]))
+
+
+def top_kmer_codes(kmer_counts: KmerCounts, top_n: int):
+    """
+    Selects the top N entries of a KmerCounts without sorting the whole table.
+    """
+    counts, codes = kmer_counts.counts, kmer_counts.codes
+    if top_n < len(counts):
+        # Keep every entry tied with the N-th largest count so tie-breaking stays exact.
+        threshold = np.partition(counts, len(counts) - top_n)[len(counts) - top_n]
+        candidates = np.flatnonzero(counts >= threshold)
+        counts, codes = counts[candidates], codes[candidates]
+    order = np.lexsort((codes, -counts))[:top_n]
+    return list(zip(decode_kmers(codes[order], kmer_counts.k), counts[order].tolist()))
+
+
+def kmer_gc_counts(codes: np.ndarray, k: int) -> np.ndarray:
+    """
+    Counts G and C bases in integer-encoded k-mers with one popcount per code.
+
+    C (01) and G (10) are the only codes whose two bits differ, so XOR-ing each code with
+    itself shifted by one bit and keeping the low bit of every base marks the GC bases.
+
+    Args:
+        codes (np.ndarray): uint64 k-mer codes.
+        k (int): Length of the k-mers.
+
+    Returns:
+        np.ndarray: Number of G/C bases per k-mer.
+    """
+    codes = np.asarray(codes, dtype=np.uint64)
+    low_bits = np.uint64(int("01" * k, 2))
+    return np.bitwise_count((codes ^ (codes >> np.uint64(1))) & low_bits)
+
+
+def gc_fractions(seqs: list[str]) -> np.ndarray:
+    """
+    Calculates the GC content of many sequences in a single NumPy pass.
+
+    Args:
+        seqs (list[str]): DNA sequences of any length.
+
+    Returns:
+        np.ndarray: Proportion of G and C bases per sequence.
+    """
+    lengths = np.fromiter((len(seq) for seq in seqs), dtype=np.int64, count=len(seqs))
+    is_gc = GC_TABLE[np.frombuffer("".join(seqs).encode("ascii", "replace"), np.uint8)]
+    gc_cumsum = np.concatenate(([0], np.cumsum(is_gc, dtype=np.int64)))
+    ends = np.cumsum(lengths)
+    return (gc_cumsum[ends] - gc_cumsum[ends - lengths]) / lengths
 
 
 def gc_content(seq: str) -> float:
     """
     Calculates the GC content of a DNA sequence.
 
+    Uses the string-based `gc_fractions`, not `kmer_gc_counts`: sequences can be longer
+    than MAX_K and contain bases other than ACGT, which count towards the length.
+
     Args:
         seq (str): DNA sequence.
 
     Returns:
         float: Proportion of G and C bases in the sequence.
+
+    Raises:
+        ZeroDivisionError: If the sequence is empty.
     """
-    gc_count = sum(1 for nuc in seq if nuc in "GCgc")
-    return gc_count / len(seq)
+    if not seq:
+        raise ZeroDivisionError("GC content of an empty sequence")
+    return float(gc_fractions([seq])[0])
 
 
 def filter_kmers_by_gc(kmer_counts: dict[str, int], min_gc: float):
     """
     Filters k-mers based on a minimum GC content threshold.
 
+    KmerCounts are filtered on their integer codes without decoding rejected k-mers;
+    other mappings are scored with one `gc_fractions` call over all keys. A
+    CountMinSketch is filtered over its heavy-hitter candidates.
+
     Args:
         kmer_counts (dict[str, int]): Dictionary of k-mer counts.
         min_gc (float): Minimum GC content required (between 0 and 1).
@@ -90,8 +823,15 @@ def filter_kmers_by_gc(kmer_counts: dict[str, int], min_gc: float):
     Returns:
         list[str]: List of k-mers meeting the GC content requirement.
     """
-    kmer_pass = []
-    for kmer in kmer_counts.keys():
-        if gc_content(kmer) > min_gc:
-            kmer_pass.append(kmer)
-    return kmer_pass
+    if isinstance(kmer_counts, CountMinSketch):
+        kmer_counts = kmer_counts.heavy_hitters()
+    if isinstance(kmer_counts, KmerCounts):
+        k = kmer_counts.k
+        passed = kmer_gc_counts(kmer_counts.codes, k) / k > min_gc
+        return decode_kmers(kmer_counts.codes[passed], k)
+
+    kmers = list(kmer_counts.keys())
+    if not kmers:
+        return []
+    passed = gc_fractions(kmers) > min_gc
+    return [kmer for kmer, keep in zip(kmers, passed.tolist()) if keep]
@@ -2,10 +2,13 @@
 
 """
 Simple script to calculate GC content over a sliding window in a compressed FASTA file.
-Can run in single-core or multiprocessing mode.
+Can run in single-core, multiprocessing or NumPy (prefix sum) mode.
 
 Usage:
     ./assignment4.py --input GCF_000005845.2_ASM584v2_genomic.fna.gz --w 10000
+    ./assignment4.py --input GCF_000005845.2_ASM584v2_genomic.fna.gz --w 10000 --modes numpy
+    ./assignment4.py --input GCF_000005845.2_ASM584v2_genomic.fna.gz --w 10000 --step 100 --modes numpy
+    ./assignment4.py --input genome.fna --w 10000 --region NC_000913.3:1-500000
 """
 
 # METADATA VARIABLES
@@ -15,146 +18,529 @@ __version__ = "1.0"
 
 # IMPORTS
 import argparse
-import gzip
 import pathlib
+import sys
 import multiprocessing as mp
+import queue as queue_module
 import time
+import traceback
+import numpy as np
+
+# The streaming FASTA reader is shared with the motif tools of assignment 3
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "assignment3"))
+from fastareader import FastaReader  # noqa: E402
+from fastaindex import FastaIndex  # noqa: E402
+from motiftools import GC_TABLE  # noqa: E402
+from sharedarray import SharedArray  # noqa: E402
+from gcwriter import BINARY_FORMATS, FORMATS, WindowWriter, encode_windows  # noqa: E402
+
+# Number of bases of windows sent to a worker in one queue message
+BATCH_BASES = 2**20
+# Seconds between checks that the workers are still alive while waiting on a queue
+WORKER_POLL_INTERVAL = 1.0
+
 
 # CLASSES
 class Counter:
     """
-    GC content counter using multiprocessing.
+    GC content counter using a pool of worker processes.
+
+    The reader places each block of sequence in shared memory once and puts batches of
+    many windows, as (block name, slice, first start, number of windows) tuples, on a
+    bounded task queue. `workers` processes attach to the block by name, score whole
+    batches on a zero-copy view with NumPy prefix sums and return them encoded in the
+    output format. Only the main process writes, in batch order, so the output matches
+    the single-core counter.
     """
-    def __init__(self, input_file, window_size):
+    def __init__(
+        self, input_file, window_size, region=None, step=None, workers=None, output=None, fmt="text"
+    ):
         """
-        Set up input file, window size, and a multiprocessing queue.
+        Set up input file, window size, optional region and step, output, and the task and
+        result queues.
         """
         self.input = input_file
         self.window_size = window_size
-        self.queue = mp.Queue()
+        self.region = region
+        self.step = step or window_size
+        self.workers = workers or mp.cpu_count()
+        self.output = output
+        self.fmt = fmt
+        self.writer = None
+        self.procs = []
+        self.queue = mp.Queue(maxsize=2 * self.workers)
+        self.results = mp.Queue()
 
     def read_fasta(self):
         """
-        Read compressed FASTA file, split sequence into chunks,
-        and put them in a queue for processing.
-        """
-        with gzip.open(self.input, "rt") as fasta_f:
-            buffer = ""
-            total_len = 0
-            for line in fasta_f:
-                if line.startswith(">"):
-                    continue
-                line = line.strip()
-                buffer += line
-                total_len += len(line)
-                while len(buffer) >= self.window_size:
-                    chunk = buffer[: self.window_size]
-                    start = total_len - len(buffer)
-                    end = start + len(chunk)
-                    self.queue.put((chunk, start, end))
-                    buffer = buffer[self.window_size :]
-            if buffer:
-                self.queue.put((buffer, total_len - len(buffer), total_len))
+        Read FASTA file, copy each block into shared memory and yield
+        (block, batches) pairs, with batches of about BATCH_BASES bases of windows.
+        Blocks and batches never span two records, so every batch is an independent
+        unit of work, whichever record it comes from.
+        """
+        windows_per_batch = max(BATCH_BASES // self.step, 1)
+        for name, seq, seq_start, starts in window_blocks(
+            self.input, self.window_size, self.step, self.region
+        ):
+            block = SharedArray.from_array(seq)
+            batches = []
+            for i in range(0, len(starts), windows_per_batch):
+                batch_starts = starts[i : i + windows_per_batch]
+                first = int(batch_starts[0]) - seq_start
+                last = min(int(batch_starts[-1]) - seq_start + self.window_size, len(seq))
+                batches.append((name, first, last, first + seq_start, len(batch_starts)))
+            yield block, batches
+
+    def worker(self, queue, results):
+        """
+        Get batches from queue, calculate GC content of their windows, and return them
+        encoded in the output format. Reports None when done, or ("error", traceback)
+        when a batch fails, so the main process never waits on a worker that has stopped.
+        """
+        block = None
+        try:
+            while True:
+                batch = queue.get()
+                if batch is None:
+                    results.put(None)  # Signal that this worker is done
+                    break
+                index, spec, name, first, last, offset, n_windows = batch
+                if block is None or block.spec != spec:
+                    if block is not None:
+                        block.close()
+                    block = SharedArray.attach(*spec)
+                starts = offset + self.step * np.arange(n_windows)
+                windows = gc_windows(block.array[first:last], offset, starts, self.window_size)
+                data = encode_windows(self.fmt, name, *windows)
+                results.put((index, name, data, n_windows))
+        except Exception:
+            results.put(("error", traceback.format_exc()))
+            sys.exit(1)
+        finally:
+            if block is not None:
+                block.close()
 
-    def worker(self, queue):
+    def check_workers(self):
         """
-        Get chunks from queue, calculate GC content, and print it.
+        Raise if a worker process failed or was killed.
         """
+        for proc in self.procs:
+            if proc.exitcode not in (None, 0):
+                raise RuntimeError(f"GC worker {proc.pid} exited with code {proc.exitcode}")
+
+    def put_task(self, task, pending, next_index):
+        """
+        Put a task on the bounded queue. While it is full, write finished batches and
+        check that the workers are alive. Returns the index of the next batch to print.
+        """
+        while True:
+            try:
+                self.queue.put(task, timeout=WORKER_POLL_INTERVAL)
+                return next_index
+            except queue_module.Full:
+                next_index, _ = self.print_ready(pending, next_index, block=False)
+                self.check_workers()
+
+    def print_ready(self, pending, next_index, block):
+        """
+        Move finished batches from the result queue to `pending` and write every batch
+        that is next in line. Returns the index of the next batch to print and the
+        number of workers that reported they are done. Raises if a worker reported an
+        error or died.
+        """
+        done = 0
         while True:
-            chunk = queue.get()
-            if chunk[0] is None:
-                break
-            gc_count = sum(1 for nuc in chunk[0] if nuc in "GCgc")
-            gc_content = gc_count / len(chunk[0])
-            print(f"{chunk[1]} - {chunk[2]}: {gc_content:.2%}")
+            try:
+                result = self.results.get(block=block, timeout=WORKER_POLL_INTERVAL)
+            except queue_module.Empty:
+                if not block:
+                    break
+                self.check_workers()
+                continue
+            if result is None:
+                done += 1
+            elif result[0] == "error":
+                raise RuntimeError(f"GC worker failed:\n{result[1]}")
+            else:
+                pending[result[0]] = result[1:]
+            block = False
+        while next_index in pending:
+            self.writer.write_encoded(*pending.pop(next_index))
+            next_index += 1
+        return next_index, done
 
     def run(self):
         """
-        Start worker process and read FASTA file.
+        Start worker processes, feed them batches and write results in order.
+        Shared blocks are released once every batch that uses them is written, and
+        all of them when a worker fails.
         """
-        proc = mp.Process(target=self.worker, args=(self.queue,))
-        proc.start()
-        self.read_fasta()
-        self.queue.put((None, None, None))  # Signal to stop worker
-        proc.join()
+        SharedArray.start_tracker()
+        self.procs = [
+            mp.Process(target=self.worker, args=(self.queue, self.results))
+            for _ in range(self.workers)
+        ]
+        for proc in self.procs:
+            proc.start()
+        self.writer = WindowWriter(self.output, self.fmt)
+        blocks = []  # (index after the block's last batch, SharedArray)
+        names = []  # Every block of this run, to check none is left behind
+        try:
+            pending, next_index, done, index = {}, 0, 0, 0
+            for block, batches in self.read_fasta():
+                blocks.append((index + len(batches), block))
+                names.append(block.spec[0])
+                for batch in batches:
+                    next_index = self.put_task((index, block.spec, *batch), pending, next_index)
+                    index += 1
+                    next_index, _ = self.print_ready(pending, next_index, block=False)
+                    release_blocks(blocks, next_index)
+            for _ in self.procs:
+                next_index = self.put_task(None, pending, next_index)  # Signal to stop worker
+            while done < len(self.procs):
+                next_index, finished = self.print_ready(pending, next_index, block=True)
+                done += finished
+        except BaseException:
+            for proc in self.procs:  # Workers may be waiting for tasks that never come
+                proc.terminate()
+            raise
+        finally:
+            for proc in self.procs:
+                proc.join(timeout=1)
+                if proc.is_alive():
+                    proc.terminate()
+                    proc.join()
+            release_blocks(blocks, None)
+            self.writer.close()
+            leaked = SharedArray.leaked(names)
+            if leaked:
+                print(f"Shared memory blocks left behind: {', '.join(leaked)}", file=sys.stderr)
 
 
 class Counter_single_core:
     """
     GC content counter using a single process.
     """
-    def __init__(self, input_file, window_size):
+    def __init__(self, input_file, window_size, region=None, step=None, output=None, fmt="text"):
         """
-        Set up input file and window size.
+        Set up input file, window size, optional region and window step, and output.
         """
         self.input = input_file
         self.window_size = window_size
+        self.region = region
+        self.step = step or window_size
+        self.output = output
+        self.fmt = fmt
+        self.writer = None
 
     def read_fasta(self):
         """
         Read compressed FASTA file, split sequence into chunks,
         and process each chunk.
         """
-        with gzip.open(self.input, "rt") as fasta_f:
-            buffer = ""
-            total_len = 0
-            for line in fasta_f:
-                if line.startswith(">"):
-                    continue
-                line = line.strip()
-                buffer += line
-                total_len += len(line)
-                while len(buffer) >= self.window_size:
-                    chunk = buffer[: self.window_size]
-                    start = total_len - len(buffer)
-                    end = start + len(chunk)
-                    self.process_chunk(chunk, start, end)
-                    buffer = buffer[self.window_size :]
-            if buffer:
-                self.process_chunk(buffer, total_len - len(buffer), total_len)
+        if self.step != self.window_size:
+            self.read_sliding()
+            return
+        for window in fasta_windows(self.input, self.window_size, self.region):
+            self.process_chunk(*window)
+
+    def read_sliding(self):
+        """
+        Read FASTA file and write GC content of windows that start every `step` bases
+        of each record.
 
-    def process_chunk(self, seq, start, end):
+        The GC count is updated incrementally: the bases that leave the previous window
+        are subtracted and the bases that enter the new one are added, so each base is
+        counted at most twice however much the windows overlap.
         """
-        Calculate and print GC content for one chunk.
+        offset, chunks = fasta_chunks(self.input, self.region)
+        buffer, buffer_start = b"", offset
+        next_start, last_end = offset, offset
+        window = None  # (start, end, gc_count) of the previous window
+        for name, chunk, last in chunks:
+            buffer += chunk
+            buffer_end = buffer_start + len(buffer)
+            for start in window_range(
+                next_start, buffer_end, self.window_size, self.step, last_end, last
+            ):
+                end = min(start + self.window_size, buffer_end)
+                if window and start < window[1]:
+                    gc_count = (
+                        window[2]
+                        - count_gc(buffer[window[0] - buffer_start : start - buffer_start])
+                        + count_gc(buffer[window[1] - buffer_start : end - buffer_start])
+                    )
+                else:
+                    gc_count = count_gc(buffer[start - buffer_start : end - buffer_start])
+                window = (start, end, gc_count)
+                self.writer.add(name, start, end, gc_count / (end - start))
+                next_start, last_end = start + self.step, end
+
+            if last:  # The next record starts again at coordinate 0
+                buffer, buffer_start, next_start, last_end, window = b"", 0, 0, 0, None
+                continue
+            keep_from = min(next_start, window[0]) if window else next_start
+            drop = min(keep_from - buffer_start, len(buffer))
+            buffer, buffer_start = buffer[drop:], buffer_start + drop
+
+    def process_chunk(self, name, seq, start, end):
+        """
+        Calculate GC content for one chunk and add it to the output buffer.
         """
         gc_count = sum(1 for nuc in seq if nuc in "GCgc")
         gc_content = gc_count / len(seq)
-        print(f"{start} - {end}: {gc_content:.2%}")
+        self.writer.add(name, start, end, gc_content)
 
     def run(self):
         """
         Run the single-core GC content counter.
         """
-        self.read_fasta()
+        with WindowWriter(self.output, self.fmt) as self.writer:
+            self.read_fasta()
+
+
+class Counter_numpy:
+    """
+    GC content counter using NumPy prefix sums.
+
+    Each block of sequence is turned into a uint8 array once and a cumulative sum of
+    GC indicators is taken over it; the GC count of every window is then the difference
+    of two entries of that sum, whatever the window size and step.
+    """
+    def __init__(self, input_file, window_size, region=None, step=None, output=None, fmt="text"):
+        """
+        Set up input file, window size, optional region and window step, and output.
+        """
+        self.input = input_file
+        self.window_size = window_size
+        self.region = region
+        self.step = step or window_size
+        self.output = output
+        self.fmt = fmt
+        self.writer = None
+
+    def read_fasta(self):
+        """
+        Read FASTA file in blocks and score every complete window of each block.
+        Bases from the next window start onwards are carried over to the next block.
+        """
+        for name, seq, seq_start, starts in window_blocks(
+            self.input, self.window_size, self.step, self.region
+        ):
+            self.process_block(name, seq, seq_start, starts)
+
+    def process_block(self, name, seq, offset, starts):
+        """
+        Calculate and write GC content for the windows of record `name` starting at `starts`.
+        """
+        self.writer.write(name, *gc_windows(seq, offset, starts, self.window_size))
+
+    def run(self):
+        """
+        Run the NumPy GC content counter.
+        """
+        with WindowWriter(self.output, self.fmt) as self.writer:
+            self.read_fasta()
+
+
+def window_range(next_start, buffer_end, window_size, step, last_end, final):
+    """
+    Return the range of window starts that can be scored with the sequence read so far.
+
+    Windows start every `step` bases. Only complete windows are returned until the
+    input is exhausted; then one clipped window is added if the last window did not
+    reach the end of the sequence, like the last partial tile of non-overlapping windows.
+    """
+    n_full = max((buffer_end - window_size - next_start) // step + 1, 0)
+    stop = next_start + n_full * step
+    if n_full:
+        last_end = stop - step + window_size
+    if final and stop < buffer_end and last_end < buffer_end:
+        stop += step
+    return range(next_start, stop, step)
+
+
+def window_blocks(input_file, window_size, step, region=None):
+    """
+    Stream the FASTA input and yield (name, sequence, sequence start, window starts)
+    blocks.
+
+    Each block holds the uint8 sequence of one record from the first unscored window
+    start onwards and the starts of every window that lies completely inside it (plus
+    the clipped last window at the end of the record). Windows restart at 0 for every
+    record, so they never span two records.
+    """
+    offset, chunks = fasta_chunks(input_file, region)
+    seq, seq_start = np.empty(0, dtype=np.uint8), offset
+    next_start, last_end = offset, offset
+    for name, chunk, last in chunks:
+        seq = np.concatenate((seq, np.frombuffer(chunk, dtype=np.uint8)))
+        window_starts = window_range(
+            next_start, seq_start + len(seq), window_size, step, last_end, last
+        )
+        starts = np.arange(window_starts.start, window_starts.stop, window_starts.step)
+        if len(starts):
+            yield name, seq, seq_start, starts
+            next_start = int(starts[-1]) + step
+            last_end = min(int(starts[-1]) + window_size, seq_start + len(seq))
+        if last:
+            seq, seq_start = np.empty(0, dtype=np.uint8), 0
+            next_start, last_end = 0, 0
+            continue
+        drop = min(next_start - seq_start, len(seq))
+        seq, seq_start = seq[drop:], seq_start + drop
+
+
+def gc_windows(seq, offset, starts, window_size):
+    """
+    Return the (starts, ends, GC contents) arrays for windows of a uint8 sequence that
+    begins at `offset`, using a cumulative sum of GC indicators.
+    """
+    gc_cumsum = np.concatenate(([0], np.cumsum(GC_TABLE[seq], dtype=np.int64)))
+    starts = starts - offset
+    ends = np.minimum(starts + window_size, len(seq))
+    gc_contents = (gc_cumsum[ends] - gc_cumsum[starts]) / (ends - starts)
+    return starts + offset, ends + offset, gc_contents
+
+
+def release_blocks(blocks, next_index):
+    """
+    Close and unlink the shared blocks whose batches have all been printed
+    (all blocks when `next_index` is None).
+    """
+    while blocks and (next_index is None or blocks[0][0] <= next_index):
+        blocks.pop(0)[1].close()
+
+
+def count_gc(seq):
+    """
+    Count G and C bases (either case) in a bytes sequence.
+    """
+    return seq.count(b"G") + seq.count(b"C") + seq.count(b"g") + seq.count(b"c")
+
+
+def fasta_chunks(input_file, region=None):
+    """
+    Return the first coordinate and a (name, chunk, last) stream for the input.
+
+    Without a region the whole file is streamed; with a region only that slice is
+    read from the memory-mapped, indexed FASTA file.
+    """
+    if region is None:
+        return 0, FastaReader(input_file).chunks()
+    index = FastaIndex(input_file)
+    name, start, _ = index.parse_region(region)
+    return start, iter([(name, index.fetch(region), True)])
+
+
+def fasta_windows(input_file, window_size, region=None):
+    """
+    Stream a (gzipped) FASTA file and yield (name, sequence, start, end) windows.
+
+    Windows restart at 0 for every record and the last window of a record is clipped
+    at its end. The reader yields large blocks, so the buffer never grows beyond one
+    block plus one window.
+    """
+    buffer = b""
+    start, chunks = fasta_chunks(input_file, region)
+    for name, chunk, last in chunks:
+        buffer += chunk
+        n_windows = len(buffer) // window_size
+        for i in range(n_windows):
+            window = buffer[i * window_size : (i + 1) * window_size]
+            yield name, window.decode(), start, start + window_size
+            start += window_size
+        buffer = buffer[n_windows * window_size :]
+        if last:
+            if buffer:
+                yield name, buffer.decode(), start, start + len(buffer)
+            buffer, start = b"", 0
 
 
 def time_run(name, runner):
     """
     Measure and return the time it takes to run a counter.
     """
-    start = time.time()
+    start = time.perf_counter()
     runner.run()
-    end = time.time()
+    end = time.perf_counter()
     return f"{name} version took {end - start:.4f} seconds"
 
 
+MODES = {
+    "single": ("Solo process", Counter_single_core),
+    "multiprocessing": ("Multiprocessing", Counter),
+    "numpy": ("NumPy", Counter_numpy),
+}
+
+
 def main():
     """
-    Parse arguments, run both single-core and multiprocessing versions, and print runtimes.
+    Parse arguments, run the selected counter versions, and print runtimes.
     """
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", required=True, type=pathlib.Path, help="Input gzipped FASTA file")
     parser.add_argument("--w", dest="window_size", required=True, type=int, help="Window size")
+    parser.add_argument(
+        "--region",
+        help="Only scan this region, e.g. chr1:1000-2000 (1-based, inclusive; uncompressed input)",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=MODES,
+        default=["single", "multiprocessing"],
+        help="Counter versions to run and time (default: single multiprocessing)",
+    )
+    parser.add_argument(
+        "--step",
+        type=int,
+        help="Distance between window starts (default: the window size, no overlap)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=mp.cpu_count(),
+        help="Worker processes for the multiprocessing version (default: all cores)",
+    )
+    parser.add_argument(
+        "--format",
+        dest="fmt",
+        choices=FORMATS,
+        default="text",
+        help="Output format (default: text); f32 and npy are float32 GC fractions",
+    )
+    parser.add_argument(
+        "--output",
+        type=pathlib.Path,
+        help="Write windows to this file instead of stdout (each mode overwrites it)",
+    )
     args = parser.parse_args()
+    if args.fmt == "npy" and args.output is None:
+        parser.error("--format npy needs --output")
+    if args.step is not None and args.step <= 0:
+        parser.error("--step must be a positive number of bases")
 
-    solo = Counter_single_core(args.input, args.window_size)
-    solo_time = time_run("Solo process", solo)
-
-    parallel = Counter(args.input, args.window_size)
-    mp_time = time_run("Multiprocessing", parallel)
+    times = []
+    for mode in args.modes:
+        name, counter_class = MODES[mode]
+        options = {"workers": args.workers} if mode == "multiprocessing" else {}
+        counter = counter_class(
+            args.input,
+            args.window_size,
+            args.region,
+            args.step,
+            output=args.output,
+            fmt=args.fmt,
+            **options,
+        )
+        times.append(time_run(name, counter))
 
-    print(solo_time)
-    print(mp_time)
+    # Keep binary output on stdout clean
+    binary_stdout = args.output is None and args.fmt in BINARY_FORMATS
+    timing_file = sys.stderr if binary_stdout else sys.stdout
+    for run_time in times:
+        print(run_time, file=timing_file)
 
 
 if __name__ == "__main__":
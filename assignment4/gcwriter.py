@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+"""
+    usage:
+        Only to be imported as module
+
+    This module writes the GC content of windows in batches, in one of several formats:
+    - text: the "start - end: pct" lines of the original script, after a ">name" line
+      at the start of every record
+    - bedgraph: chrom, start, end and GC fraction, tab separated, no header
+    - tsv: chrom, start, end and GC fraction with a header line
+    - f32: raw little-endian float32 GC fractions, one per window, record after record
+    - npy: the same float32 array as a NumPy .npy file (needs a seekable output file)
+"""
+
+# METADATA VARIABLES
+__author__ = "Orfeas Gkourlias"
+__status__ = "Production"
+__version__ = "1.0"
+
+# IMPORTS
+import struct
+import sys
+import numpy as np
+
+# CONSTANTS
+FORMATS = ("text", "bedgraph", "tsv", "f32", "npy")
+BINARY_FORMATS = ("f32", "npy")
+BUFFER_WINDOWS = 2**16
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_HEADER_SIZE = 128
+
+
+# CLASSES
+class WindowWriter:
+    """
+    Batched writer for window GC contents.
+
+    Only the process that owns the writer writes to the output, so lines of different
+    workers never interleave; workers encode their batches with `encode_windows` and
+    hand the bytes over. Output goes to a file, or to stdout when no path is given.
+
+    Attributes:
+        fmt (str): One of FORMATS.
+        chrom (str): Record of the last windows written.
+        n_windows (int): Number of windows written so far.
+
+    Methods:
+        add(chrom, start, end, gc_content):
+            Buffers a single window, and writes the buffer once it is full.
+
+        write(chrom, starts, ends, gc_contents):
+            Encodes and writes a batch of windows of one record given as arrays.
+
+        write_encoded(chrom, data, n_windows):
+            Writes a batch that was already encoded with `encode_windows`.
+
+        close():
+            Writes what is buffered, completes the .npy header and closes the file.
+    """
+    def __init__(self, output=None, fmt="text"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown output format {fmt!r}, choose from {', '.join(FORMATS)}")
+        if fmt == "npy" and output is None:
+            raise ValueError("npy output needs an output file, the header is written last")
+        self.fmt = fmt
+        self.chrom = None
+        self.n_windows = 0
+        self.buffer = []
+        self.buffer_chrom = None
+        if output is None:
+            sys.stdout.flush()
+            self.stream = sys.stdout.buffer
+        else:
+            self.stream = open(output, "wb")
+        if fmt == "tsv":
+            self.stream.write(b"chrom\tstart\tend\tgc\n")
+        elif fmt == "npy":
+            self.stream.write(npy_header(0))
+
+    def add(self, chrom, start, end, gc_content):
+        if chrom != self.buffer_chrom or len(self.buffer) >= BUFFER_WINDOWS:
+            self.flush_buffer()
+            self.buffer_chrom = chrom
+        self.buffer.append((start, end, gc_content))
+
+    def flush_buffer(self):
+        if self.buffer:
+            starts, ends, gc_contents = zip(*self.buffer)
+            self.buffer = []
+            self.write(self.buffer_chrom, starts, ends, gc_contents)
+
+    def write(self, chrom, starts, ends, gc_contents):
+        data = encode_windows(self.fmt, chrom, starts, ends, gc_contents)
+        self.write_encoded(chrom, data, len(gc_contents))
+
+    def write_encoded(self, chrom, data, n_windows):
+        if self.fmt == "text" and chrom != self.chrom:
+            self.stream.write(f">{chrom}\n".encode())
+        self.chrom = chrom
+        self.stream.write(data)
+        self.n_windows += n_windows
+
+    def close(self):
+        if self.stream is None:
+            return
+        self.flush_buffer()
+        if self.fmt == "npy":
+            self.stream.seek(0)
+            self.stream.write(npy_header(self.n_windows))
+        if self.stream is sys.stdout.buffer:
+            self.stream.flush()
+        else:
+            self.stream.close()
+        self.stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# FUNCTIONS
+def encode_windows(fmt, chrom, starts, ends, gc_contents) -> bytes:
+    """
+    Return a batch of windows of record `chrom` encoded in one of FORMATS, ready to be
+    written (text batches without their record line, which the writer adds).
+    """
+    if fmt in BINARY_FORMATS:
+        return np.asarray(gc_contents, dtype="<f4").tobytes()
+    rows = zip(
+        np.asarray(starts).tolist(), np.asarray(ends).tolist(), np.asarray(gc_contents).tolist()
+    )
+    if fmt == "text":
+        lines = [f"{start} - {end}: {gc_content:.2%}\n" for start, end, gc_content in rows]
+    else:
+        lines = [f"{chrom}\t{start}\t{end}\t{gc_content:.6f}\n" for start, end, gc_content in rows]
+    return "".join(lines).encode()
+
+
+def npy_header(n_windows) -> bytes:
+    """
+    Return a fixed-size .npy (version 1.0) header for a float32 array of `n_windows`,
+    so it can be rewritten in place once the number of windows is known.
+    """
+    header = repr({"descr": "<f4", "fortran_order": False, "shape": (n_windows,)})
+    header = header.ljust(NPY_HEADER_SIZE - len(NPY_MAGIC) - 3) + "\n"
+    return NPY_MAGIC + struct.pack("<H", len(header)) + header.encode()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+"""
+    usage:
+        Only to be imported as module
+
+    This module places NumPy arrays in multiprocessing.shared_memory, so worker
+    processes can attach to them by name and get zero-copy views instead of
+    receiving pickled copies.
+"""
+
+# METADATA VARIABLES
+__author__ = "Orfeas Gkourlias"
+__status__ = "Production"
+__version__ = "1.0"
+
+# IMPORTS
+import os
+import sys
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+# CONSTANTS
+SHM_DIR = "/dev/shm"  # Where Linux exposes POSIX shared memory blocks
+
+
+# CLASSES
+class SharedArray:
+    """
+    A NumPy array backed by a named shared memory block.
+
+    The creating process owns the block: used as a context manager it closes and
+    unlinks the block on exit, also when an exception is raised. Workers attach with
+    `SharedArray.attach(*shared.spec)` and only close their view.
+
+    Call `SharedArray.start_tracker()` before starting the worker processes.
+
+    Attributes:
+        shm (shared_memory.SharedMemory): The shared memory block.
+        array (np.ndarray): Array view on the block.
+        owner (bool): Whether this process created (and must unlink) the block.
+
+    Methods:
+        from_array(array):
+            Creates a shared block holding a copy of `array`.
+
+        attach(name, shape, dtype):
+            Attaches to an existing block created by another process.
+
+        spec:
+            Picklable (name, shape, dtype) tuple to send to workers.
+
+        close():
+            Releases this process's view, and unlinks the block if it is the owner.
+
+        leaked(names):
+            Returns the names of blocks that still exist, to check they were all unlinked.
+    """
+    def __init__(self, shm, shape, dtype, owner):
+        self.shm = shm
+        self.owner = owner
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    @classmethod
+    def from_array(cls, array):
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = cls(shm, array.shape, array.dtype, owner=True)
+        shared.array[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, name, shape, dtype):
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # Registers the block again, harmless when the tracker is shared (see start_tracker)
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, shape, dtype, owner=False)
+
+    @staticmethod
+    def start_tracker():
+        """
+        Start the resource tracker before starting worker processes, so workers share
+        the owner's tracker instead of starting their own, which would unlink every
+        block a worker attached to when that worker exits.
+        """
+        resource_tracker.ensure_running()
+
+    @staticmethod
+    def leaked(names):
+        """
+        Return the block names in `names` that still exist in SHM_DIR (none where shared
+        memory is not exposed as files).
+        """
+        return [name for name in names if os.path.exists(os.path.join(SHM_DIR, name.lstrip("/")))]
+
+    @property
+    def spec(self):
+        return self.shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.array = None  # Drop the view before the buffer is released
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # Views handed out are still alive; the mapping goes when they do
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
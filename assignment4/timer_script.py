@@ -1,78 +1,273 @@
 #!/usr/bin/env python3
 
 """
-Benchmark script to compare GC content counting using single-core and multiprocessing.
-Runs both methods multiple times with random window sizes.
+Benchmark suite for the GC content counters of assignment4.py.
+
+Sweeps window size, worker count and counter version over a FASTA file, or over a
+synthetic genome generated locally. Every configuration runs in its own process, with
+warm-up runs before the timed repeats, and window output goes to os.devnull so console
+printing is not measured. Reports median and interquartile range of the runtimes,
+throughput in bases per second and peak RSS, and writes all results to JSON.
 
 Usage:
-    ./timer_script.py --input GCF_000005845.2_ASM584v2_genomic.fna.gz --num-runs 35
+    ./timer_script.py --genome-size 5000000 --windows 100 1000 10000 --json results.json
+    ./timer_script.py --input GCF_000005845.2_ASM584v2_genomic.fna.gz --workers 1 2 4 8
 """
 
 # METADATA VARIABLES
 __author__ = "Orfeas Gkourlias"
 __status__ = "Production"
-__version__ = "1.0"
+__version__ = "2.0"
 
 # IMPORTS
-import sys
 import argparse
-import pathlib
+import gzip
+import json
 import multiprocessing as mp
+import os
+import pathlib
+import platform
+import queue
+import resource
+import sys
+import tempfile
 import time
-import random
-from assignment4 import Counter, Counter_single_core
+import numpy as np
+import assignment4
+from assignment4 import MODES, FastaReader
+
+# CONSTANTS
+LINE_WIDTH = 80
+# Seconds between checks that a benchmark process is still alive
+POLL_INTERVAL = 1.0
 
 
-def time_run(runner):
+# FUNCTIONS
+def write_genome(path, size, records=1, gc=0.5, seed=0):
     """
-    Measure how long it takes to run the given runner object.
+    Write a gzipped FASTA file of `records` random records with `size` bases in total,
+    where each base is G or C with probability `gc`.
     """
-    start = time.time()
-    runner.run()
-    end = time.time()
-    return end - start
+    rng = np.random.default_rng(seed)
+    weights = [(1 - gc) / 2, gc / 2, gc / 2, (1 - gc) / 2]
+    bases = np.frombuffer(b"ACGT", dtype=np.uint8)
+    lengths = [size // records + (i < size % records) for i in range(records)]
+    with gzip.open(path, "wb", compresslevel=1) as fasta_f:
+        for i, length in enumerate(lengths):
+            fasta_f.write(f">synthetic_{i + 1} length={length}\n".encode())
+            seq = bases[rng.choice(4, size=length, p=weights)]
+            n_lines = -(-length // LINE_WIDTH)
+            lines = np.full((n_lines, LINE_WIDTH + 1), ord("\n"), dtype=np.uint8)
+            lines[:, :LINE_WIDTH] = np.pad(seq, (0, n_lines * LINE_WIDTH - length)).reshape(
+                n_lines, LINE_WIDTH
+            )
+            data = lines.tobytes()
+            if length % LINE_WIDTH:  # Drop the padding of the last, shorter line
+                data = data[: -(LINE_WIDTH - length % LINE_WIDTH) - 1] + b"\n"
+            fasta_f.write(data)
 
 
-def main():
+def count_bases(path):
     """
-    Run multiple benchmarks with random window sizes.
-    Compare single-core and multiprocessing runtimes.
+    Return the number of sequence bases in a FASTA file.
     """
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--input", required=True, type=pathlib.Path, help="Input gzipped FASTA file")
-    parser.add_argument("--num-runs", required=True, type=int, help="Number of times to run each method")
-    args = parser.parse_args()
+    return sum(len(chunk) for _, chunk, _ in FastaReader(path).chunks())
+
+
+def benchmark_worker(config, repeats, warmup, results):
+    """
+    Run one configuration `warmup` + `repeats` times in a fresh process and put the
+    timed runtimes and the peak RSS of this process and its workers on `results`.
+    """
+    mode, input_file, window_size, workers, fmt = config
+    options = {"workers": workers} if mode == "multiprocessing" else {}
+    times = []
+    for i in range(warmup + repeats):
+        counter = MODES[mode][1](input_file, window_size, output=os.devnull, fmt=fmt, **options)
+        start = time.perf_counter()
+        counter.run()
+        if i >= warmup:
+            times.append(time.perf_counter() - start)
+    # ru_maxrss is in KiB on Linux
+    own_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    worker_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    results.put((times, own_rss, worker_rss))
+
+
+def run_config(config, repeats, warmup):
+    """
+    Benchmark one configuration in a child process and return its runtimes and peak RSS.
+    Raises RuntimeError when the child exits without results (its traceback is on stderr).
+    """
+    results = mp.Queue()
+    proc = mp.Process(target=benchmark_worker, args=(config, repeats, warmup, results))
+    proc.start()
+    try:
+        while True:
+            try:
+                times, own_rss, worker_rss = results.get(timeout=POLL_INTERVAL)
+                break
+            except queue.Empty:
+                if proc.exitcode is not None and results.empty():
+                    raise RuntimeError(f"benchmark process exited with code {proc.exitcode}")
+    finally:
+        proc.join()
+    return times, own_rss, worker_rss
 
-    solo_times = []
-    mp_times = []
-    window_sizes = []
 
-    for _ in range(args.num_runs):
-        w = random.randint(50, 1400)  # Choose a random window size
-        window_sizes.append(w)
+def summarise(times, n_bases):
+    """
+    Return median, interquartile range, min and max of the runtimes in seconds,
+    and the throughput at the median runtime in bases per second.
+    """
+    q1, median, q3 = np.percentile(times, [25, 50, 75])
+    return {
+        "median_s": median,
+        "iqr_s": q3 - q1,
+        "min_s": min(times),
+        "max_s": max(times),
+        "bases_per_s": n_bases / median,
+    }
 
-        solo = Counter_single_core(args.input, w)
-        mp_counter = Counter(args.input, w)
 
-        solo_t = time_run(solo)
-        mp_t = time_run(mp_counter)
+def configurations(args, input_file):
+    """
+    Yield (mode, input, window size, workers, format) tuples for every benchmark.
+    Worker counts only apply to the multiprocessing counter.
+    """
+    for window_size in args.windows:
+        for mode in args.modes:
+            for workers in args.workers if mode == "multiprocessing" else [None]:
+                yield mode, input_file, window_size, workers, args.fmt
 
-        solo_times.append(solo_t)
-        mp_times.append(mp_t)
 
-    # Print results
-    print("\nWindow sizes:")
-    print(window_sizes)
+def environment():
+    """
+    Return a description of the machine and software the benchmark ran on.
+    """
+    return {
+        "assignment4_version": assignment4.__version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main():
+    """
+    Parse arguments, run every configuration, print a summary table and write JSON.
+    """
+    parser = argparse.ArgumentParser()
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument("--input", type=pathlib.Path, help="FASTA file to benchmark on")
+    input_group.add_argument(
+        "--genome-size", type=int, help="Generate a synthetic genome with this many bases"
+    )
+    parser.add_argument("--records", type=int, default=1, help="Records in the synthetic genome")
+    parser.add_argument("--gc", type=float, default=0.5, help="GC fraction of the synthetic genome")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic genome")
+    parser.add_argument(
+        "--windows", nargs="+", type=int, default=[100, 1000, 10000], help="Window sizes to sweep"
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=MODES, default=list(MODES), help="Counter versions to sweep"
+    )
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        type=int,
+        default=sorted({1, mp.cpu_count()}),
+        help="Worker counts to sweep for the multiprocessing version (default: 1 and all cores)",
+    )
+    parser.add_argument(
+        "--format",
+        dest="fmt",
+        choices=assignment4.FORMATS,
+        default="text",
+        help="Output format the counters encode (written to os.devnull)",
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per configuration")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per configuration")
+    parser.add_argument("--json", type=pathlib.Path, help="Write the results to this JSON file")
+    args = parser.parse_args()
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+    if min(args.windows) < 1:
+        parser.error("--windows must all be at least 1")
+    if min(args.workers) < 1:
+        parser.error("--workers must all be at least 1")
 
-    print("\nSolo run times:")
-    print(solo_times)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.input is None:
+            input_file = pathlib.Path(tmp_dir) / "synthetic.fa.gz"
+            write_genome(input_file, args.genome_size, args.records, args.gc, args.seed)
+            source = {
+                "synthetic": True,
+                "genome_size": args.genome_size,
+                "records": args.records,
+                "gc": args.gc,
+                "seed": args.seed,
+            }
+        else:
+            input_file = args.input
+            source = {"synthetic": False, "input": str(args.input)}
+        n_bases = count_bases(input_file)
 
-    print("\nMultiprocessing run times:")
-    print(mp_times)
+        print(
+            f"{'mode':<16}{'w':>8}{'workers':>8}{'median s':>12}{'IQR s':>10}"
+            f"{'Mb/s':>10}{'RSS MiB':>10}"
+        )
+        results = []
+        for config in configurations(args, input_file):
+            mode, _, window_size, workers, fmt = config
+            try:
+                times, own_rss, worker_rss = run_config(config, args.repeats, args.warmup)
+            except RuntimeError as e:
+                # Record the failure and go on with the other configurations
+                results.append(
+                    {
+                        "mode": mode,
+                        "window_size": window_size,
+                        "workers": workers,
+                        "format": fmt,
+                        "error": str(e),
+                    }
+                )
+                print(f"{mode:<16}{window_size:>8}{workers or '-':>8}  failed: {e}")
+                sys.stdout.flush()
+                continue
+            summary = summarise(times, n_bases)
+            results.append(
+                {
+                    "mode": mode,
+                    "window_size": window_size,
+                    "workers": workers,
+                    "format": fmt,
+                    "times_s": times,
+                    **summary,
+                    "peak_rss_mib": own_rss / 1024,
+                    "peak_worker_rss_mib": worker_rss / 1024,
+                }
+            )
+            print(
+                f"{mode:<16}{window_size:>8}{workers or '-':>8}{summary['median_s']:>12.4f}"
+                f"{summary['iqr_s']:>10.4f}{summary['bases_per_s'] / 1e6:>10.2f}"
+                f"{max(own_rss, worker_rss) / 1024:>10.1f}"
+            )
+            sys.stdout.flush()
 
-    print("\nAverage times:")
-    print(f"Solo: {sum(solo_times) / len(solo_times):.4f} seconds")
-    print(f"MP:   {sum(mp_times) / len(mp_times):.4f} seconds")
+    if args.json:
+        report = {
+            "environment": environment(),
+            "input": {**source, "bases": n_bases},
+            "repeats": args.repeats,
+            "warmup": args.warmup,
+            "results": results,
+        }
+        with open(args.json, "w") as json_f:
+            json.dump(report, json_f, indent=2)
 
 
 if __name__ == "__main__":
@@ -12,45 +12,98 @@ __version__ = "1.0"
 
 # IMPORTS
 import os
+import sys
+from contextlib import ExitStack
+import matplotlib
+matplotlib.use("Agg")  # Plots are only saved, never shown
 import matplotlib.pyplot as plt
 import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+# The shared memory helper lives with the GC counter of assignment 4
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assignment4"))
+from sharedarray import SharedArray  # noqa: E402
+
+# CONSTANTS
+FIGSIZE = (25, 3)
+PLOT_TIMEOUT = 300  # Seconds to wait for a sensor plot before counting it as failed
 
 # CLASSES
 class Drawer:
     """
     Drawer is a class for generating and saving plots of sensor data with machine status and anomaly annotations.
 
+    Plots are drawn by one long-lived pool of worker processes that is shared by every Drawer,
+    so processes are forked and matplotlib is set up once, not once per sensor and file.
+
     Attributes:
         df (pandas.DataFrame): The input DataFrame containing sensor data and status columns.
         img_dir (str): Directory where generated images will be saved.
+        pool (multiprocessing.pool.Pool): The shared plotting pool (class attribute).
 
     Methods:
         __init__(df, img_dir="img"):
             Initializes the Drawer with a DataFrame and image directory.
 
-        worker(sensor, df, img_dir, completed_list):
-            Generates and saves a plot for a single sensor, highlighting "BROKEN", "RECOVERING", and anomaly points.
-            Appends the sensor name to completed_list upon successful completion.
+        start_pool(processes=None):
+            Starts the shared plotting pool with `processes` workers (default: all cores), if it is not
+            running yet. Call it before starting threads, so the workers are forked from a single thread.
+
+        close_pool():
+            Stops the shared plotting pool.
+
+        worker(sensor, row, values_spec, index_spec, masks_spec, img_dir):
+            Attaches to the shared sensor matrix, index and status masks, and generates and saves a plot
+            for a single sensor, highlighting "BROKEN", "RECOVERING", and anomaly points. The grey sensor
+            line is decimated to the first, last, minimum and maximum point per pixel column; the marked
+            points are always plotted in full.
+            Returns the sensor name upon successful completion, else None.
 
         run():
-            Spawns a separate process for each sensor column to generate plots in parallel.
-            Waits for all processes to complete and prints the list of completed sensors.
+            Places the sensor values, index and status masks in shared memory once, then submits one task
+            per sensor column to the plotting pool. Each task only refers to its own row of the sensor
+            matrix. Waits up to PLOT_TIMEOUT seconds for each task, so a hung or killed worker counts as
+            a failed plot, and prints the list of completed sensors.
     """
+    pool = None
+
     def __init__(self, df, img_dir="img"):
         self.df = df
         self.img_dir = img_dir
         os.makedirs(self.img_dir, exist_ok=True)
 
-    def worker(self, sensor, df, img_dir, completed_list):
+    @classmethod
+    def start_pool(cls, processes=None):
+        if cls.pool is None:
+            SharedArray.start_tracker()
+            cls.pool = mp.Pool(processes, initializer=init_worker)
+        return cls.pool
+
+    @classmethod
+    def close_pool(cls):
+        if cls.pool is not None:
+            cls.pool.close()
+            cls.pool.join()
+            cls.pool = None
+
+    @staticmethod
+    def worker(sensor, row, values_spec, index_spec, masks_spec, img_dir):
+        values = index = masks = None
         try:
-            broken_rows = df[df["machine_status"] == "BROKEN"]
-            recovery_rows = df[df["machine_status"] == "RECOVERING"]
-            anomaly_rows = df[df["LocalOutlierFactor"] == -1]
-
-            plt.figure(figsize=(25, 3))
-            plt.plot(df[sensor], color="grey")
+            values = SharedArray.attach(*values_spec)
+            index = SharedArray.attach(*index_spec)
+            masks = SharedArray.attach(*masks_spec)
+            series = pd.Series(values.array[row], index=pd.Index(index.array))
+            broken_rows = series[masks.array[0]]
+            recovery_rows = series[masks.array[1]]
+            anomaly_rows = series[masks.array[2]]
+
+            plt.figure(figsize=FIGSIZE)
+            n_buckets = int(FIGSIZE[0] * plt.rcParams["figure.dpi"])
+            plt.plot(series.iloc[decimate(index.array, values.array[row], n_buckets)], color="grey")
             plt.plot(
-                recovery_rows[sensor],
+                recovery_rows,
                 linestyle="none",
                 marker="o",
                 color="yellow",
@@ -59,7 +112,7 @@ class Drawer:
                 alpha=0.5,
             )
             plt.plot(
-                broken_rows[sensor],
+                broken_rows,
                 linestyle="none",
                 marker="X",
                 color="red",
@@ -67,7 +120,7 @@ class Drawer:
                 label="broken",
             )
             plt.plot(
-                anomaly_rows[sensor],
+                anomaly_rows,
                 linestyle="none",
                 marker="X",
                 color="blue",
@@ -81,27 +134,84 @@ class Drawer:
             filename = f"{sensor}.png"
             path = os.path.join(img_dir, filename)
             plt.savefig(path)
-            plt.close()
 
-            completed_list.append(sensor)
+            return sensor
         except Exception as e:
             print(f"Error plotting {sensor}: {e}")
+            return None
+        finally:
+            plt.close()  # Also when plotting failed, so the worker never piles up open figures
+            for shared in (values, index, masks):
+                if shared is not None:
+                    shared.close()
 
     def run(self):
-        manager = mp.Manager()
-        completed_plots = manager.list()
-        processes = []
-
-        for col in self.df.columns:
-            if "sensor" in col:
-                p = mp.Process(
-                    target=self.worker,
-                    args=(col, self.df, self.img_dir, completed_plots),
-                )
-                p.start()
-                processes.append(p)
-
-        for p in processes:
-            p.join()
+        pool = self.start_pool()
+        sensors = [col for col in self.df.columns if "sensor" in col]
+        masks = np.stack(
+            [
+                (self.df["machine_status"] == "BROKEN").to_numpy(),
+                (self.df["machine_status"] == "RECOVERING").to_numpy(),
+                (self.df["LocalOutlierFactor"] == -1).to_numpy(),
+            ]
+        )
+
+        with ExitStack() as shared:
+            # One row per sensor, so every worker reads a contiguous block
+            values = shared.enter_context(
+                SharedArray.from_array(self.df[sensors].to_numpy(dtype=np.float64).T)
+            )
+            index = shared.enter_context(SharedArray.from_array(self.df.index.to_numpy()))
+            masks = shared.enter_context(SharedArray.from_array(masks))
 
-        print(f"Completed plots for sensors: {list(completed_plots)}")
+            tasks = [
+                pool.apply_async(
+                    self.worker, (col, row, values.spec, index.spec, masks.spec, self.img_dir)
+                )
+                for row, col in enumerate(sensors)
+            ]
+            # The shared blocks are only released once every task is done with them, or timed out
+            completed_plots = []
+            for col, task in zip(sensors, tasks):
+                try:
+                    sensor = task.get(timeout=PLOT_TIMEOUT)
+                except mp.TimeoutError:
+                    print(f"Error plotting {col}: no result after {PLOT_TIMEOUT} seconds")
+                    continue
+                if sensor:
+                    completed_plots.append(sensor)
+
+        print(f"Completed plots for sensors: {completed_plots}")
+        return completed_plots
+
+
+# FUNCTIONS
+def decimate(x, y, n_buckets):
+    """
+    Returns the sorted positions of the points to draw of a line with ascending `x`: the first,
+    last, minimum and maximum point of each of `n_buckets` equal-width x buckets (M4 decimation).
+    A line through these points covers the same pixels as the full line at that width.
+    """
+    if len(y) <= 4 * n_buckets:
+        return np.arange(len(y))
+    x = np.asarray(x).view(np.int64) if np.asarray(x).dtype.kind == "M" else np.asarray(x)
+    span = max(x[-1] - x[0], 1)
+    buckets = np.minimum((x - x[0]) / span * n_buckets, n_buckets - 1).astype(np.int64)
+    firsts = np.flatnonzero(np.diff(buckets, prepend=-1))
+    lasts = np.append(firsts[1:] - 1, len(y) - 1)
+    counts = np.diff(np.append(firsts, len(y)))
+
+    # fmin/fmax skip NaN, so a gap does not hide the rest of the bucket
+    keep = [firsts, lasts]
+    for reduce in (np.fmin, np.fmax):
+        extremes = np.repeat(reduce.reduceat(y, firsts), counts)
+        hits = np.flatnonzero(y == extremes)
+        keep.append(hits[np.unique(buckets[hits], return_index=True)[1]])
+    return np.unique(np.concatenate(keep))
+
+
+def init_worker():
+    """
+    Sets up a plotting pool process once: the non-interactive Agg backend.
+    """
+    plt.switch_backend("Agg")
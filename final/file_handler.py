@@ -11,8 +11,24 @@ __status__ = "Production"
 __version__ = "1.0"
 
 # IMPORTS
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import numpy as np
 import pandas as pd
 
+# CONSTANTS
+SENSOR_PREFIX = "sensor_"
+SENSOR_DTYPE = np.float32
+# The multithreaded pyarrow CSV parser is used when it is installed
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+CACHE_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
 
 # CLASSES
 class FileHandler:
@@ -21,6 +37,7 @@ class FileHandler:
 
     Attributes:
         file_path (str): Path to the CSV file.
+        cache_dir (str): Directory beside the CSV file holding the cleaned DataFrame as .npy files.
         full_df (pd.DataFrame): The loaded and processed DataFrame.
         numerical_cols (pd.Index): Index of numerical columns in the DataFrame (excluding 'machine_status').
 
@@ -29,8 +46,9 @@ class FileHandler:
             Initializes the FileHandler with the specified file path.
 
         read_csv():
-            Reads the CSV file at self.file_path into a pandas DataFrame, parses the 'timestamp' column as datetime,
-            and sets it as the DataFrame index.
+            Reads the CSV file at self.file_path into a pandas DataFrame with an explicit schema: float32
+            'sensor_*' columns and a categorical 'machine_status'. The 'timestamp' column is parsed as datetime
+            by the reader and set as the DataFrame index, and the unnamed row number column is skipped.
             Returns:
                 pd.DataFrame: The loaded DataFrame.
 
@@ -45,18 +63,39 @@ class FileHandler:
         write_csv(df):
             Writes the provided DataFrame to self.file_path as a CSV file.
 
-        run():
+        read_cache():
+            Loads the cleaned DataFrame from cache_dir, memory-mapped, if it was made from the current CSV file.
+            The CSV file counts as unchanged when its size and mtime match, or else when its SHA-256 digest does.
+            Returns:
+                pd.DataFrame | None: The cached DataFrame, or None when the cache is missing or stale.
+
+        write_cache(df):
+            Stores a cleaned DataFrame in cache_dir: the numerical columns as one matrix, the index and the
+            'machine_status' category codes as .npy files, and the source key and schema in meta.json.
+
+        run(cache=False):
             Executes the full pipeline: reads the CSV, performs quality control, and returns the cleaned DataFrame.
+            With cache=True the cleaned DataFrame is loaded from (or saved to) cache_dir instead; when the cache
+            cannot be written (e.g. a read-only directory) that is logged and the DataFrame is still returned.
             Returns:
                 pd.DataFrame: The cleaned DataFrame after processing.
     """
     def __init__(self, file_path):
         self.file_path = file_path
+        self.cache_dir = f"{file_path}.cache"
 
     def read_csv(self):
-        self.full_df = pd.read_csv(self.file_path, index_col=0)
-        self.full_df["timestamp"] = pd.to_datetime(self.full_df["timestamp"])
-        self.full_df = self.full_df.set_index("timestamp")
+        columns = pd.read_csv(self.file_path, nrows=0).columns
+        dtypes = {col: SENSOR_DTYPE for col in columns if col.startswith(SENSOR_PREFIX)}
+        dtypes["machine_status"] = "category"
+        self.full_df = pd.read_csv(
+            self.file_path,
+            usecols=list(columns[1:]),
+            dtype=dtypes,
+            parse_dates=["timestamp"],
+            index_col="timestamp",
+            engine=CSV_ENGINE,
+        )
         return self.full_df
 
     def qc(self):
@@ -71,15 +110,114 @@ class FileHandler:
         self.full_df[self.numerical_cols] = self.full_df[self.numerical_cols].fillna(
             self.full_df[self.numerical_cols].mean()
         )
-        self.full_df[self.numerical_cols] = self.full_df[self.numerical_cols].fillna(
-            self.full_df[self.numerical_cols].mean()
-        )
         return self.full_df
 
     def write_csv(self, df):
         df.to_csv(self.file_path)
 
-    def run(self):
+    def read_cache(self):
+        meta_path = os.path.join(self.cache_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as meta_f:
+            meta = json.load(meta_f)
+        stat = os.stat(self.file_path)
+        source = meta["source"]
+        if meta["version"] != CACHE_VERSION or source["size"] != stat.st_size:
+            return None
+        if source["mtime_ns"] != stat.st_mtime_ns:
+            if source["sha256"] != file_digest(self.file_path):
+                return None
+            try:
+                self.write_meta({**meta, "source": {**source, "mtime_ns": stat.st_mtime_ns}})
+            except OSError as e:  # The cache is still valid, only the digest is computed again next time
+                logger.warning(f"Could not update {meta_path}: {e}")
+
+        # Copy-on-write mappings: pages are read on demand and writes stay private
+        values = np.load(os.path.join(self.cache_dir, "values.npy"), mmap_mode="c")
+        index = np.load(os.path.join(self.cache_dir, "index.npy"), mmap_mode="c")
+        codes = np.load(os.path.join(self.cache_dir, "status.npy"), mmap_mode="c")
+        # The matrix is stored one column per row, so every column is a contiguous view
+        df = pd.DataFrame(
+            values.T,
+            index=pd.Index(index, name=meta["index_name"]),
+            columns=meta["numerical"],
+            copy=False,
+        )
+        df = df.astype(meta["dtypes"], copy=False)
+        status = pd.Categorical.from_codes(codes, categories=meta["categories"])
+        df.insert(meta["columns"].index("machine_status"), "machine_status", status)
+        self.full_df = df
+        self.numerical_cols = df.columns.drop("machine_status")
+        return df
+
+    def write_cache(self, df):
+        numerical = df.columns.drop("machine_status")
+        status = df["machine_status"].astype("category")
+        stat = os.stat(self.file_path)
+        meta = {
+            "version": CACHE_VERSION,
+            "source": {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": file_digest(self.file_path),
+            },
+            "columns": list(df.columns),
+            "numerical": list(numerical),
+            "dtypes": {col: str(dtype) for col, dtype in df[numerical].dtypes.items()},
+            "index_name": df.index.name,
+            "categories": list(status.cat.categories),
+        }
+
+        # Build the cache in a temporary directory and move it into place
+        tmp_dir = f"{self.cache_dir}.tmp{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        try:
+            os.makedirs(tmp_dir)
+            np.save(os.path.join(tmp_dir, "values.npy"), df[numerical].to_numpy().T)
+            np.save(os.path.join(tmp_dir, "index.npy"), df.index.to_numpy())
+            np.save(os.path.join(tmp_dir, "status.npy"), status.cat.codes.to_numpy())
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as meta_f:
+                json.dump(meta, meta_f)
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            os.replace(tmp_dir, self.cache_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # Never leave a half-written cache behind
+            raise
+
+    def write_meta(self, meta):
+        meta_path = os.path.join(self.cache_dir, "meta.json")
+        try:
+            with open(f"{meta_path}.tmp", "w") as meta_f:
+                json.dump(meta, meta_f)
+            os.replace(f"{meta_path}.tmp", meta_path)
+        except BaseException:
+            if os.path.exists(f"{meta_path}.tmp"):
+                os.remove(f"{meta_path}.tmp")
+            raise
+
+    def run(self, cache=False):
+        if cache:
+            df = self.read_cache()
+            if df is not None:
+                return df
         self.read_csv()
-        self.qc()
-        return self.qc()
+        df = self.qc()
+        if cache:
+            try:
+                self.write_cache(df)
+            except OSError as e:
+                logger.warning(f"Could not write cache {self.cache_dir}: {e}")
+        return df
+
+
+# FUNCTIONS
+def file_digest(path, block_size=2**22):
+    """
+    Returns the SHA-256 digest of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as input_f:
+        while block := input_f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
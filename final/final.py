@@ -15,9 +15,10 @@ import os
 # os.environ["OPENBLAS_NUM_THREADS"] = str(1)
 import argparse
 import pathlib
+from drawer import Drawer
 from file_handler import FileHandler
 from mlm import MLM
-from watcher import Watcher
+from watcher import BACKENDS, STAGES, Watcher
 import pandas as pd
 
 pd.options.mode.chained_assignment = None  # default="warn"
@@ -29,14 +30,65 @@ def argparser():
     parser.add_argument("--output", "-o", required=True, type=pathlib.Path)
     parser.add_argument("--trainfile", "-t", required=True, type=pathlib.Path)
     parser.add_argument("--num-threads", "-n", default=1, type=int)
+    parser.add_argument(
+        "--watch-backend",
+        choices=BACKENDS,
+        default="auto",
+        help="How new input files are detected (default: inotify when available, else polling)",
+    )
+    parser.add_argument(
+        "--polling-interval",
+        type=float,
+        default=5,
+        help="Seconds between directory scans of the polling backend (default: 5)",
+    )
+    for stage in STAGES:
+        parser.add_argument(
+            f"--{stage}-workers",
+            type=int,
+            default=1,
+            help=f"Files handled at once by the {stage} stage of the pipeline (default: 1)",
+        )
+    parser.add_argument(
+        "--plot-processes",
+        type=int,
+        help="Size of the plotting process pool shared by all files (default: all cores)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=2,
+        help="Files waiting per worker in front of each pipeline stage (default: 2)",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=pathlib.Path,
+        help="Record of processed input files, kept across restarts (default: output_dir/manifest.json)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-read and clean the training file instead of using its .cache directory",
+    )
     return parser.parse_args()
 
 
 def main():
     args = argparser()
-    df = FileHandler(args.trainfile).run()
+    df = FileHandler(args.trainfile).run(cache=not args.no_cache)
     model = MLM(df, args.num_threads).run()
-    Watcher(model, args.input, args.output).run()
+    # Fork the plotting processes before the pipeline threads start
+    Drawer.start_pool(args.plot_processes)
+    Watcher(
+        model,
+        args.input,
+        args.output,
+        polling_interval=args.polling_interval,
+        backend=args.watch_backend,
+        workers={stage: getattr(args, f"{stage}_workers") for stage in STAGES},
+        queue_size=args.queue_size,
+        manifest_path=args.manifest,
+    ).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""
+    usage:
+        Import as module
+
+    Minimal ctypes binding to the Linux inotify API, used by the Watcher to be told
+    when a file in the input directory is complete instead of polling for it.
+"""
+
+# METADATA VARIABLES
+__author__ = "Orfeas Gkourlias"
+__status__ = "Production"
+__version__ = "1.0"
+
+# IMPORTS
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+
+# CONSTANTS
+IN_CLOSE_WRITE = 0x00000008  # A file opened for writing was closed
+IN_MOVED_TO = 0x00000080  # A file was renamed into the watched directory
+IN_Q_OVERFLOW = 0x00004000  # Events were dropped, the directory must be rescanned
+IN_CLOEXEC = os.O_CLOEXEC
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, length of the name that follows
+READ_SIZE = 64 * 1024
+
+
+def load_libc():
+    """
+    Returns the C library if it provides inotify, else None.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    return libc
+
+
+LIBC = load_libc()
+
+
+# CLASSES
+class Inotify:
+    """
+    An inotify instance watching one or more directories.
+
+    Attributes:
+        fd (int): The inotify file descriptor.
+
+    Methods:
+        add_watch(path, mask):
+            Starts watching `path` for the events in `mask` and returns the watch descriptor.
+
+        read(timeout=None):
+            Waits up to `timeout` seconds (forever if None) and returns the pending events
+            as (wd, mask, cookie, name) tuples.
+
+        close():
+            Closes the inotify file descriptor, removing all watches.
+    """
+    def __init__(self):
+        if LIBC is None:
+            raise OSError("inotify is not available on this system")
+        self.fd = LIBC.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1: {os.strerror(errno)}")
+
+    def add_watch(self, path, mask):
+        wd = LIBC.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch: {os.strerror(errno)}", str(path))
+        return wd
+
+    def read(self, timeout=None):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, READ_SIZE)
+        events = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, pos)
+            pos += EVENT.size
+            name = data[pos : pos + length].rstrip(b"\0")
+            pos += length
+            events.append((wd, mask, cookie, os.fsdecode(name)))
+        return events
+
+    def fileno(self):
+        return self.fd
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# FUNCTIONS
+def available() -> bool:
+    """
+    Returns True if inotify can be used on this system.
+    """
+    return LIBC is not None
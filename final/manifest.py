@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""
+    usage:
+        Import as module
+
+    Persistent record of the input files the Watcher has finished or is still processing,
+    so a restarted watcher only processes new or changed files.
+"""
+
+# METADATA VARIABLES
+__author__ = "Orfeas Gkourlias"
+__status__ = "Production"
+__version__ = "1.0"
+
+# IMPORTS
+import json
+import os
+import threading
+from file_handler import file_digest
+
+# CONSTANTS
+FINISHED = "finished"
+FAILED = "failed"
+IN_FLIGHT = "in_flight"
+DONE = (FINISHED, FAILED)
+
+
+# CLASSES
+class Manifest:
+    """
+    JSON manifest of input files, keyed by file name, holding the size, mtime and SHA-256 digest
+    of the content that was processed and its state ("in_flight", "finished" or "failed").
+
+    Every change is written to a temporary file that is moved over the manifest, so a crash
+    never leaves a half-written manifest. Files still "in_flight" after a restart were
+    interrupted and are processed again. Failed files are skipped until their content changes.
+
+    Attributes:
+        path (str): Location of the manifest file.
+        entries (dict): File name to {"size", "mtime_ns", "sha256", "state"}.
+
+    Methods:
+        is_done(file_path, stat=None):
+            Returns True if the file finished or failed with its current content. Size and mtime
+            are compared first; the file is only hashed when its mtime changed but its size did not.
+
+        was_done(filename):
+            Returns True if the file finished or failed, judged by name only, without a stat.
+
+        start(file_path):
+            Records the file, with its digest, as in flight.
+
+        finish(filename):
+            Records the file as finished.
+
+        fail(filename):
+            Records the file as failed, so it is not processed again until its content changes.
+
+        interrupted():
+            Returns the names of the files that were in flight when the manifest was loaded.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as manifest_f:
+                self.entries = json.load(manifest_f)
+        self.loaded_in_flight = [
+            filename for filename, entry in self.entries.items() if entry["state"] == IN_FLIGHT
+        ]
+
+    def is_done(self, file_path, stat=None):
+        entry = self.entries.get(os.path.basename(file_path))
+        if entry is None or entry["state"] not in DONE:
+            return False
+        stat = stat or os.stat(file_path)
+        if entry["size"] != stat.st_size:
+            return False
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        if entry["sha256"] != file_digest(file_path):
+            return False
+        with self.lock:  # Same content, only touched: remember the new mtime
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self.save()
+        return True
+
+    def was_done(self, filename):
+        entry = self.entries.get(filename)
+        return entry is not None and entry["state"] in DONE
+
+    def start(self, file_path):
+        stat = os.stat(file_path)
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_digest(file_path),
+            "state": IN_FLIGHT,
+        }
+        with self.lock:
+            self.entries[os.path.basename(file_path)] = entry
+            self.save()
+
+    def finish(self, filename):
+        with self.lock:
+            self.entries[filename]["state"] = FINISHED
+            self.save()
+
+    def fail(self, filename):
+        with self.lock:
+            if filename in self.entries:  # Not recorded when the file vanished before ingest
+                self.entries[filename]["state"] = FAILED
+                self.save()
+
+    def interrupted(self):
+        return list(self.loaded_in_flight)
+
+    def save(self):
+        """
+        Writes the manifest to a temporary file and moves it into place (call with the lock held).
+        """
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp_path, "w") as manifest_f:
+            json.dump(self.entries, manifest_f, indent=1)
+        os.replace(tmp_path, self.path)
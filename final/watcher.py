@@ -11,11 +11,21 @@ __status__ = "Production"
 __version__ = "1.0"
 
 # IMPORTS
+import itertools
 import os
+import queue
+import threading
 import time
 import logging
+import inotify
 from drawer import Drawer
 from file_handler import FileHandler
+from manifest import Manifest
+
+# CONSTANTS
+BACKENDS = ("auto", "inotify", "poll")
+STAGES = ("ingest", "score", "plot", "write")
+RECHECK_SCANS = 12  # Polled scans between stat checks of files the manifest has as done
 
 # CLASSES
 class Watcher:
@@ -23,31 +33,96 @@ class Watcher:
     Watcher monitors a specified input directory for new CSV files, processes them using a provided model,
     generates visualizations, and writes the results to an output directory.
 
+    Files go through a pipeline of four stages (ingest, score, plot, write). Every stage has its own pool of
+    worker threads and a bounded inbox queue, so several files are processed at once, and detection blocks
+    (backpressure) when the ingest queue is full instead of queueing files without limit.
+
     Attributes:
         model: An object with a `predict_df` method for making predictions on DataFrames.
         input_dir (str): Path to the directory to monitor for new CSV files.
         output_dir (str): Path to the directory where output files and images will be saved.
         log_file (str): Path to the log file for recording events (default: "model.log").
         polling_interval (int): Time interval in seconds between directory scans (default: 5).
-        img_dir (str): Path to the directory where generated images will be saved.
+        backend (str): How new files are detected: "inotify", "poll", or "auto" for inotify when available.
+        img_dir (str): Path to the directory where generated images are saved, in a subdirectory per file.
         logger (logging.Logger): Logger instance for recording events.
+        manifest (Manifest): On-disk record of the files finished, failed or in flight, kept across restarts
+            (default: manifest.json in the output directory).
+        in_flight (set): Names of the files currently in the pipeline.
+        workers (dict): Number of worker threads per stage (default: 1 each).
+        queues (dict): Bounded inbox queue per stage, holding queue_size items per worker.
 
     Methods:
         run():
             Continuously monitors the input directory for new CSV files, processes each file only once,
             applies the model's prediction, generates visualizations, saves the results, and logs actions.
+
+        detect():
+            Yields the names of complete CSV files: first those already in the input directory, then new ones.
+
+        inotify_files():
+            Yields files as soon as the kernel reports they were closed after writing or renamed into the
+            input directory, so files that are still being written are never picked up. Files found by a
+            scan (at startup, or after the event queue overflowed) are yielded once they are settled, or
+            when their close event arrives.
+
+        polled_files():
+            Fallback that scans the input directory every polling_interval seconds, and yields a file once
+            its size and mtime are unchanged between two scans, or at startup when it is already settled.
+            Files the manifest has as finished or failed are skipped by name, and only stat-ed every
+            RECHECK_SCANS scans to notice changed content.
+
+        settled(file_path):
+            Returns True if the file was not modified for polling_interval seconds.
+
+        start() / stop():
+            Starts the stage worker threads, and stops them once every queued file is done.
+
+        submit(filename):
+            Puts a detected file on the ingest queue, unless the manifest shows it finished or failed with its
+            current content or it is already in the pipeline.
+
+        ingest(filename), score(item), plot(item), write(item):
+            The stages: read and clean the CSV file, predict anomalies, plot the sensors and write the results.
+            Items passed between stages are (filename, DataFrame) tuples.
+
+        process(filename):
+            Runs all stages for one CSV file in the calling thread.
     """
     def __init__(
-        self, model, input_dir, output_dir, log_file="model.log", polling_interval=5
+        self,
+        model,
+        input_dir,
+        output_dir,
+        log_file="model.log",
+        polling_interval=5,
+        backend="auto",
+        workers=None,
+        queue_size=2,
+        manifest_path=None,
     ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, choose from {', '.join(BACKENDS)}")
+        if backend == "auto":
+            backend = "inotify" if inotify.available() else "poll"
         self.model = model
         self.polling_interval = polling_interval
+        self.backend = backend
         self.input_dir = input_dir
         self.output_dir = output_dir
         self.img_dir = f"{self.output_dir}/img"
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.workers = {stage: 1 for stage in STAGES}
+        self.workers.update(workers or {})
+        self.queues = {
+            stage: queue.Queue(maxsize=queue_size * self.workers[stage]) for stage in STAGES
+        }
+        self.threads = {}
 
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.img_dir, exist_ok=True)
+        self.manifest = Manifest(manifest_path or os.path.join(self.output_dir, "manifest.json"))
 
         logging.basicConfig(
             filename=log_file,
@@ -58,16 +133,166 @@ class Watcher:
         self.logger = logging.getLogger(__name__)
 
     def run(self):
-        self.logger.info(f"Monitoring {self.input_dir} for new files...")
-        finished_tracker = set()  # Moved here
+        self.logger.info(f"Monitoring {self.input_dir} for new files ({self.backend})...")
+        interrupted = self.manifest.interrupted()
+        if interrupted:
+            self.logger.info(f"Resuming {len(interrupted)} interrupted files: {', '.join(interrupted)}")
+        self.start()
+        try:
+            for filename in self.detect():
+                self.submit(filename)
+        finally:
+            self.stop()
+
+    def start(self):
+        steps = [self.ingest, self.score, self.plot, self.write]
+        for i, (stage, step) in enumerate(zip(STAGES, steps)):
+            outbox = self.queues[STAGES[i + 1]] if i + 1 < len(STAGES) else None
+            self.threads[stage] = [
+                threading.Thread(
+                    target=self.stage_worker,
+                    args=(stage, step, self.queues[stage], outbox),
+                    name=f"{stage}-{n}",
+                    daemon=True,
+                )
+                for n in range(self.workers[stage])
+            ]
+            for thread in self.threads[stage]:
+                thread.start()
+
+    def stop(self):
+        # Stop the stages in order, so every file already queued is finished
+        for stage in STAGES:
+            for _ in self.threads.get(stage, []):
+                self.queues[stage].put(None)
+            for thread in self.threads.pop(stage, []):
+                thread.join()
+
+    def submit(self, filename):
+        with self.lock:
+            if filename in self.in_flight:
+                return
+            if self.manifest.is_done(os.path.join(self.input_dir, filename)):
+                return
+            self.in_flight.add(filename)
+        self.queues["ingest"].put(filename)  # Blocks while the pipeline is full
+
+    def stage_worker(self, stage, step, inbox, outbox):
         while True:
-            for filename in os.listdir(self.input_dir):
-                if filename.endswith(".csv") and filename not in finished_tracker:
+            item = inbox.get()
+            if item is None:
+                break
+            filename = item if isinstance(item, str) else item[0]
+            try:
+                result = step(item)
+            except Exception as e:
+                print(f"Error in {stage} stage for {filename}: {e}")
+                self.logger.error(f"Failed to {stage} {filename}: {e}")
+                self.manifest.fail(filename)
+                with self.lock:
+                    self.in_flight.discard(filename)
+                continue
+            if outbox is not None:
+                outbox.put(result)
+
+    def detect(self):
+        if self.backend == "inotify":
+            yield from self.inotify_files()
+        else:
+            yield from self.polled_files()
+
+    def settled(self, file_path):
+        """
+        Returns True if the file was last modified at least polling_interval seconds ago
+        (False if it vanished), so it is unlikely to be still being written.
+        """
+        try:
+            mtime_ns = os.stat(file_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        return time.time_ns() - mtime_ns >= self.polling_interval * 1e9
+
+    def scan(self):
+        return sorted(
+            filename
+            for filename in os.listdir(self.input_dir)
+            if filename.endswith(".csv")
+            and not self.manifest.is_done(os.path.join(self.input_dir, filename))
+        )
+
+    def inotify_files(self):
+        with inotify.Inotify() as watch:
+            # Watch before the first scan, so no file slips in between
+            watch.add_watch(self.input_dir, inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO)
+            # Scanned files may still be being written, and wait here until they are settled
+            unsettled = set(self.scan())
+            while True:
+                for filename in sorted(unsettled):
                     file_path = os.path.join(self.input_dir, filename)
-                    print(f"Processing {file_path}")
-                    df = FileHandler(file_path).run()
-                    df = self.model.predict_df(df)
-                    Drawer(df, self.img_dir).run()
-                    FileHandler(f"{self.output_dir}/{filename}-predicted").write_csv(df)
-                    finished_tracker.add(filename)
+                    if not os.path.exists(file_path):
+                        unsettled.discard(filename)
+                    elif self.settled(file_path):
+                        unsettled.discard(filename)
+                        yield filename
+                timeout = self.polling_interval if unsettled else None
+                for _, mask, _, filename in watch.read(timeout):
+                    if mask & inotify.IN_Q_OVERFLOW:
+                        self.logger.info(f"inotify queue overflowed, rescanning {self.input_dir}")
+                        unsettled.update(self.scan())
+                    elif filename.endswith(".csv"):
+                        unsettled.discard(filename)
+                        yield filename
+
+    def polled_files(self):
+        previous = {}  # Filename to (size, mtime) at the previous scan
+        for n_scan in itertools.count():
+            recheck = n_scan % RECHECK_SCANS == 0
+            current = {}
+            with os.scandir(self.input_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".csv"):
+                        continue
+                    # Done files cost no stat, unless it is time to check them for changes or
+                    # they changed at the last check and are waiting to become stable
+                    must_stat = recheck or entry.name in previous
+                    if not must_stat and self.manifest.was_done(entry.name):
+                        continue
+                    stat = entry.stat()
+                    if self.manifest.is_done(entry.path, stat):
+                        continue
+                    current[entry.name] = (stat.st_size, stat.st_mtime_ns)
+            for filename in sorted(current):
+                # A file must stop changing between two scans, or be settled already at startup
+                if previous.get(filename) == current[filename] or (
+                    n_scan == 0 and self.settled(os.path.join(self.input_dir, filename))
+                ):
+                    yield filename
+            previous = current
             time.sleep(self.polling_interval)
+
+    def ingest(self, filename):
+        file_path = os.path.join(self.input_dir, filename)
+        print(f"Processing {file_path}")
+        self.manifest.start(file_path)
+        return filename, FileHandler(file_path).run()
+
+    def score(self, item):
+        filename, df = item
+        return filename, self.model.predict_df(df)
+
+    def plot(self, item):
+        filename, df = item
+        # One image directory per file, so concurrent plots never write the same PNG
+        Drawer(df, os.path.join(self.img_dir, filename)).run()
+        return filename, df
+
+    def write(self, item):
+        filename, df = item
+        FileHandler(f"{self.output_dir}/{filename}-predicted").write_csv(df)
+        self.manifest.finish(filename)
+        with self.lock:
+            self.in_flight.discard(filename)
+        self.logger.info(f"Processed {os.path.join(self.input_dir, filename)}")
+
+    def process(self, filename):
+        self.write(self.plot(self.score(self.ingest(filename))))